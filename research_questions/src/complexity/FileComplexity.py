@@ -3,39 +3,73 @@ It gathers metrics such as lines of code (LOC), number of comment lines, number
  functions, cyclomatic complexity, and number of classes for each file
  belonging to the dataset splits."""
 
-import ast
-from IPython.core import inputtransformer2
 import subprocess
 import json
 import re
 
-from .notebook_utilities import get_code_and_comment_lines_notebook, get_markdown_line_count
+from .notebook_utilities import get_code_and_comment_lines_notebook, get_markdown_line_count, parse_notebook
 from .complexity import get_function_and_cyclomatic_complexity, complexity_notebook
+from .line_counter import count_python_lines
+from .ast_metrics import get_ast_metrics, strip_ipython_magics
+from .profiler import stage
+
+# reason saved in the errors column when the analysis of a file runs out of
+# memory (e.g. when limited by guarded_analysis):
+MEMORY_LIMIT_EXCEEDED = "memory_limit_exceeded"
 
 
 class FileComplexity:
 
-    def __init__(self, filepath: str):
+    def __init__(self, filepath: str, scc_result: dict = None,
+                 python_loc: str = 'scc', analyze: bool = True):
+        """scc_result: per file results of scc already obtained for this
+        file (e.g. by running scc for a batch of files). When None, scc runs
+        for this single file.
+        python_loc: 'scc' to count the lines of Python files with scc, or
+        'tokenize' to count them in this process with line_counter.
+        analyze: when False, the file is not analyzed, e.g. to record a file
+        whose analysis was interrupted, setting only its errors."""
 
         self.source_code = None
+        # cells of the notebook, parsed only once for all the metrics:
+        self.notebook = None
         self.filepath = filepath
+        self.scc_result = scc_result
+        self.python_loc = python_loc
         self.file_type = self.get_filetype()
         self.num_comment_lines = None
         self.markdown_lines_count = None
         self.loc = None
         self.num_functions = None
         self.functions = []
+        # cyclomatic complexity, nloc, token count and number of parameters
+        # of each function, saved in a separate table of functions:
+        self.function_metrics = []
         self.average_cyclomatic_complexity = None
         self.avg_scc_cylo = None
         self.num_classes = 0
         self.success_counting_classes = False
+        # metrics gathered in the same ast traversal that counts classes:
+        self.max_nesting_depth = None
+        self.num_imports = None
+        self.num_decision_points = None
         self.errors = None
+        # whether scc could not read the file (e.g. scc installed with snap
+        # can not read files outside the home directory):
+        self.scc_failed = False
+
+        if not analyze:
+            return
 
         try:
             self.get_file_info()
             self.get_complexity_and_functions_info()
             self.count_classes()
 
+        except MemoryError:
+            print(f"e2: {MEMORY_LIMIT_EXCEEDED}")
+            self.errors = MEMORY_LIMIT_EXCEEDED
+
         except Exception as e:
             print(f"e2: {e}")
             self.errors = str(e)
@@ -60,61 +94,95 @@ class FileComplexity:
         if self.file_type == 'notebook':
             # getting the source code content, loc and comment lines from
             # a Jupyter notebook:
-            self.source_code, self.loc ,self.num_comment_lines = get_code_and_comment_lines_notebook(self.filepath)
-            self.markdown_lines_count = get_markdown_line_count(self.filepath)
+            with stage("notebook_parse"):
+                self.notebook = parse_notebook(self.filepath)
+                self.source_code, self.loc ,self.num_comment_lines = get_code_and_comment_lines_notebook(self.filepath,
+                                                                                                        self.notebook)
+                self.markdown_lines_count = get_markdown_line_count(self.filepath, self.notebook)
         
+        elif self.file_type == 'python' and self.python_loc == 'tokenize':
+            # counting the lines of python files without running scc:
+            with stage("read"):
+                self.source_code = open(self.filepath, "r", encoding="utf-8").read()
+            with stage("line_count"):
+                line_counts = count_python_lines(self.source_code)
+
+            self.loc = line_counts['code']
+            # scc also counts docstrings as comments:
+            self.num_comment_lines = line_counts['comment'] + line_counts['docstring']
+            self.markdown_lines_count = 0
+
         else:
             # parsing other filetypes:
-            self.source_code = open(self.filepath, "r", encoding="utf-8").read()            
-            scc_results = self.analyze_file_with_scc()
+            with stage("read"):
+                self.source_code = open(self.filepath, "r", encoding="utf-8").read()            
+            if self.scc_result is None:
+                with stage("scc"):
+                    self.scc_result = self.analyze_file_with_scc()[0]
             
-            self.loc = scc_results[0]['Code']
-            self.num_comment_lines = scc_results[0]['Comment']
+            self.loc = self.scc_result['Code']
+            self.num_comment_lines = self.scc_result['Comment']
             self.markdown_lines_count = 0
 
 
     def get_complexity_and_functions_info(self):
-        if self.file_type == 'notebook':
-            # calculating function and cyclomatic complexity
-            # for notebook filetypes:
-            function_info, file_complexity = complexity_notebook(self.filepath)
-            
-        else:
-            function_info, file_complexity = get_function_and_cyclomatic_complexity(self.source_code,
-                                                                                    self.filepath
-                                                                                    )
+        with stage("lizard"):
+            if self.file_type == 'notebook':
+                # calculating function and cyclomatic complexity
+                # for notebook filetypes:
+                function_info, file_complexity = complexity_notebook(self.filepath, self.notebook)
+                
+            else:
+                function_info, file_complexity = get_function_and_cyclomatic_complexity(self.source_code,
+                                                                                        self.filepath
+                                                                                        )
         # counting the number of functions in the file:
         self.num_functions = len(function_info)
 
         for function in function_info:
             self.functions.append(function["function_name"])
+            self.function_metrics.append({
+                "function_name": function["function_name"],
+                "cyclomatic_complexity": function["function_cyclomatic_complexity"],
+                "nloc": function["function_nloc"],
+                "token_count": function["function_token_count"],
+                "parameter_count": function["function_parameter_count"],
+            })
 
         self.average_cyclomatic_complexity = file_complexity
 
     def count_classes(self):
-        """Tries to count classes with ast parsing.
+        """Tries to count classes with ast parsing, gathering the
+        other ast metrics in the same traversal. The IPython magics of
+        notebooks are transformed into Python code before parsing.
         In case the ast parse fails, regex
         is appied to find classes definitions."""
         try:
 
-            source = self.source_code
-            code_ast = ast.parse(source)
-            count = 0
+            with stage("ast"):
+                source = self.source_code
+                if self.file_type == 'notebook':
+                    source = strip_ipython_magics(self.notebook.code_cells)
 
-            for node in ast.walk(code_ast):
-                if type(node) == ast.ClassDef:
-                    count += 1
+                ast_metrics = get_ast_metrics(source)
 
             self.success_counting_classes = True
-            self.num_classes = count
+            self.num_classes = ast_metrics.num_classes
+            self.max_nesting_depth = ast_metrics.max_nesting_depth
+            self.num_imports = ast_metrics.num_imports
+            self.num_decision_points = ast_metrics.num_decision_points
+
+        except MemoryError:
+            # the regex is not tried on files too big to be parsed:
+            raise
                     
         except Exception as e:
             
 
             self.success_counting_classes = False
         
-            self.count_classes = 0
-            self.find_classes_regex(source)
+            self.num_classes = 0
+            self.find_classes_regex(self.source_code)
 
 
     def find_classes_regex(self, source_code):
@@ -143,11 +211,14 @@ class FileComplexity:
                                     check=True)
             
             analysis_result = json.loads(result.stdout)
+            if not analysis_result:
+                self.scc_failed = True
             return analysis_result
 
         except subprocess.CalledProcessError as e:
             print(f"Error running scc: {e.stderr}")
             self.errors= str(e)
+            self.scc_failed = True
             return None
 
     def to_dict(self):
@@ -163,7 +234,12 @@ class FileComplexity:
             "average_cyclomatic_complexity": self.average_cyclomatic_complexity,
             "num_classes": self.num_classes,
             "success_counting_classes": self.success_counting_classes,
-            "errors": self.errors
+            "max_nesting_depth": self.max_nesting_depth,
+            "num_imports": self.num_imports,
+            "num_decision_points": self.num_decision_points,
+            "errors": self.errors,
+            # not a column of the file results (see ResultWriter):
+            "function_metrics": self.function_metrics
         }
 
 
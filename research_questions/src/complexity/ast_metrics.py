@@ -0,0 +1,85 @@
+"""Gathers metrics of Python source code with a single traversal of its
+abstract syntax tree (ast): number of classes, maximum nesting depth of
+blocks, number of imports and number of decision points. The names and
+metrics of the functions are not gathered here: lizard already reports
+them, and they are saved from its results (<split>_functions.csv).
+
+The code of notebooks usually has IPython magics (e.g. %matplotlib inline,
+!pip install) that are not valid Python code, so they are transformed into
+Python code with IPython's inputtransformer2 before parsing the notebook."""
+
+import ast
+from IPython.core import inputtransformer2
+
+# statements that open a nested block of code (match is only available
+# since Python 3.10, and try/except* since Python 3.11):
+BLOCK_NODES = ((ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef, ast.If,
+                ast.For, ast.AsyncFor, ast.While, ast.With, ast.AsyncWith,
+                ast.Try)
+               + ((ast.Match,) if hasattr(ast, "Match") else ())
+               + ((ast.TryStar,) if hasattr(ast, "TryStar") else ()))
+
+# nodes that add a branch to the code, as counted for cyclomatic complexity:
+DECISION_NODES = ((ast.If, ast.For, ast.AsyncFor, ast.While, ast.IfExp,
+                   ast.ExceptHandler, ast.comprehension, ast.Assert)
+                  + ((ast.match_case,) if hasattr(ast, "match_case") else ()))
+
+transformer_manager = inputtransformer2.TransformerManager()
+
+
+class AstMetrics(ast.NodeVisitor):
+
+    def __init__(self):
+
+        self.num_classes = 0
+        self.num_imports = 0
+        self.num_decision_points = 0
+        self.max_nesting_depth = 0
+        self._depth = 0
+
+    def visit(self, node):
+
+        if isinstance(node, ast.ClassDef):
+            self.num_classes += 1
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            self.num_imports += 1
+
+        if isinstance(node, DECISION_NODES):
+            self.num_decision_points += 1
+        elif isinstance(node, ast.BoolOp):
+            # each 'and'/'or' adds a branch:
+            self.num_decision_points += len(node.values) - 1
+
+        if isinstance(node, BLOCK_NODES):
+            self._depth += 1
+            self.max_nesting_depth = max(self.max_nesting_depth, self._depth)
+            self.generic_visit(node)
+            self._depth -= 1
+        else:
+            self.generic_visit(node)
+
+
+def get_ast_metrics(source_code: str) -> AstMetrics:
+    """Parses the source code and gathers all its ast metrics.
+    Raises an exception when the code can not be parsed."""
+
+    metrics = AstMetrics()
+    metrics.visit(ast.parse(source_code))
+
+    return metrics
+
+
+def strip_ipython_magics(code_cells) -> str:
+    """Transforms the IPython magics of each code cell into Python code, and
+    returns the code of all the cells joined. Cell magics (e.g. %%time) are
+    only recognized in the first line of a cell, so each cell is transformed
+    separately."""
+
+    transformed_cells = []
+    for cell_source in code_cells:
+        try:
+            transformed_cells.append(transformer_manager.transform_cell(cell_source))
+        except Exception:
+            transformed_cells.append(cell_source)
+
+    return "\n".join(transformed_cells)
@@ -0,0 +1,342 @@
+"""Benchmark of the throughput of the complexity analyzers over a synthetic
+corpus, so regressions show up before running the analysis over the whole
+dataset.
+
+The corpus is generated deterministically (the same seed always generates
+the same files) with small, medium and huge Python files and notebooks, in
+the nbformat 4 layout and in the nbformat 3 layout (cells inside
+worksheets). Each analyzer runs over each group of files in a new process,
+and the benchmark reports the files analyzed per second and the peak
+resident memory (RSS) of the process. The analyzers benchmarked are
+get_code_and_comment_lines_notebook, complexity_notebook,
+get_function_and_cyclomatic_complexity and FileComplexity.
+
+A scaling check then times the tokenize line counter (count_python_lines)
+and the ast metrics over Python sources of increasing size (SCALING_SIZES
+functions), reporting the time per function at each size relative to the
+smallest one. A ratio well above 1 means the analyzer is superlinear, and it
+is reported as such (see SUPERLINEAR_RATIO).
+
+You can run this script with the command:
+
+python -m research_questions.src.complexity.benchmark_analyzers
+
+from inside the main directory of this project. Use --scale to generate more
+files, --skip-scaling to skip the scaling check, --corpus to keep the corpus in a directory, --output to save the
+results in a csv file and --python-loc scc to count the lines of Python
+files with scc (which must be installed) in FileComplexity."""
+
+import argparse
+import json
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+
+import pandas as pd
+
+from .complexity import complexity_notebook, get_function_and_cyclomatic_complexity
+from .FileComplexity import FileComplexity
+from .ast_metrics import get_ast_metrics
+from .line_counter import count_python_lines
+from .notebook_utilities import get_code_and_comment_lines_notebook
+
+# number of functions of each file and number of files of each group (with
+# --scale 1):
+FILE_SIZES = {
+    "small": {"functions": 5, "files": 100},
+    "medium": {"functions": 100, "files": 10},
+    "huge": {"functions": 2000, "files": 1},
+}
+
+NOTEBOOK_LAYOUTS = ("v4", "v3_worksheets")
+
+# number of functions of the sources of the scaling check:
+SCALING_SIZES = (500, 1000, 2000, 4000)
+
+# time per function, relative to the smallest size, above which an analyzer
+# is reported as superlinear:
+SUPERLINEAR_RATIO = 1.5
+
+# analyzers of the scaling check, run over the source code of a Python file:
+SCALING_ANALYZERS = {
+    "count_python_lines": count_python_lines,
+    "get_ast_metrics": get_ast_metrics,
+}
+
+
+def generate_function(rng: random.Random, position: int) -> str:
+    """Source of a function with comments, a docstring, nested blocks and
+    decision points"""
+
+    depth = rng.randint(1, 4)
+    lines = [f"def function_{position}(a, b={rng.randint(0, 9)}, *args):",
+             f'    """Docstring of function {position}."""',
+             "    # a comment line",
+             "    total = 0"]
+    indent = "    "
+    for level in range(depth):
+        block = rng.choice(["if a > {0}:", "for i in range({0}):",
+                            "while total < {0}:", "with open('f{0}') as f:"])
+        lines.append(indent + block.format(rng.randint(1, 99)))
+        indent += "    "
+        lines.append(indent + f"total += {level} if b else a")
+        if "while" in block:
+            lines.append(indent + "break")
+    lines.append("    return [x for x in args if x and total] or total")
+
+    return "\n".join(lines) + "\n"
+
+
+def generate_python_source(rng: random.Random, num_functions: int) -> str:
+
+    parts = ['"""Synthetic module of the benchmark."""',
+             "import os",
+             "from collections import Counter",
+             ""]
+    for position in range(num_functions):
+        if position % 10 == 0:
+            parts.append(f"class Class{position}:\n"
+                         f"    attribute = {position}\n")
+        parts.append(generate_function(rng, position))
+
+    return "\n".join(parts)
+
+
+def generate_notebook(rng: random.Random, num_functions: int,
+                      layout: str) -> dict:
+    """Notebook with markdown cells, code cells with IPython magics and
+    outputs, in the nbformat 4 layout or in the nbformat 3 layout"""
+
+    code_sources = ["%matplotlib inline\nimport os\n!pip list"]
+    markdown_sources = ["# Synthetic notebook\n\nSome *markdown* text."]
+    for position in range(num_functions):
+        code_sources.append(generate_function(rng, position))
+        if position % 5 == 0:
+            markdown_sources.append(f"## Section {position}\n\nText of the "
+                                    f"section {position}.")
+
+    # outputs make the notebook bigger, as in the real notebooks, but are
+    # not analyzed:
+    output_text = ["line of output\n"] * rng.randint(1, 50)
+
+    if layout == "v4":
+        cells = []
+        for position, source in enumerate(code_sources):
+            if position < len(markdown_sources):
+                cells.append({"cell_type": "markdown", "metadata": {},
+                              "source": markdown_sources[position].splitlines(True)})
+            cells.append({"cell_type": "code", "execution_count": position + 1,
+                          "metadata": {},
+                          "outputs": [{"name": "stdout", "output_type": "stream",
+                                       "text": output_text}],
+                          "source": source.splitlines(True)})
+
+        return {"cells": cells,
+                "metadata": {"kernelspec": {"display_name": "Python 3",
+                                            "language": "python",
+                                            "name": "python3"},
+                             "language_info": {"name": "python"}},
+                "nbformat": 4, "nbformat_minor": 4}
+
+    cells = []
+    for position, source in enumerate(code_sources):
+        if position < len(markdown_sources):
+            cells.append({"cell_type": "markdown", "metadata": {},
+                          "source": markdown_sources[position].splitlines(True)})
+        cells.append({"cell_type": "code", "collapsed": False,
+                      "input": source.splitlines(True), "language": "python",
+                      "metadata": {}, "prompt_number": position + 1,
+                      "outputs": [{"output_type": "stream", "stream": "stdout",
+                                   "text": output_text}]})
+
+    return {"metadata": {"name": ""}, "nbformat": 3, "nbformat_minor": 0,
+            "worksheets": [{"cells": cells, "metadata": {}}]}
+
+
+def generate_corpus(directory: Path, scale: float = 1, seed: int = 0) -> dict:
+    """Writes the synthetic corpus inside directory. Returns a dict mapping
+    the name of each group of files (e.g. "py_small" or "nb_v3_worksheets_huge")
+    to the paths of its files."""
+
+    rng = random.Random(seed)
+    groups = {}
+
+    for size, parameters in FILE_SIZES.items():
+        num_files = max(1, round(parameters["files"] * scale))
+
+        group = f"py_{size}"
+        Path(directory, group).mkdir(parents=True, exist_ok=True)
+        groups[group] = []
+        for position in range(num_files):
+            filepath = Path(directory, group, f"file_{position}.py")
+            filepath.write_text(generate_python_source(rng, parameters["functions"]))
+            groups[group].append(filepath)
+
+        for layout in NOTEBOOK_LAYOUTS:
+            group = f"nb_{layout}_{size}"
+            Path(directory, group).mkdir(parents=True, exist_ok=True)
+            groups[group] = []
+            for position in range(num_files):
+                filepath = Path(directory, group, f"notebook_{position}.ipynb")
+                with open(filepath, "w") as f:
+                    json.dump(generate_notebook(rng, parameters["functions"],
+                                                layout), f, indent=1)
+                groups[group].append(filepath)
+
+    return groups
+
+
+def run_line_count(filepath, python_loc):
+    get_code_and_comment_lines_notebook(filepath)
+
+
+def run_complexity_notebook(filepath, python_loc):
+    complexity_notebook(filepath)
+
+
+def run_function_complexity(filepath, python_loc):
+    # the file is read as FileComplexity does before calling lizard:
+    source_code = open(filepath, "r", encoding="utf-8").read()
+    get_function_and_cyclomatic_complexity(source_code, str(filepath))
+
+
+def run_file_complexity(filepath, python_loc):
+    FileComplexity(str(filepath), python_loc=python_loc)
+
+
+# analyzers benchmarked, and the type of files each one runs over:
+ANALYZERS = {
+    "get_code_and_comment_lines_notebook": (run_line_count, "nb"),
+    "complexity_notebook": (run_complexity_notebook, "nb"),
+    "get_function_and_cyclomatic_complexity": (run_function_complexity, "py"),
+    "FileComplexity": (run_file_complexity, None),
+}
+
+
+def run_benchmark(analyzer, filepaths, python_loc):
+    """Runs an analyzer over the files. Returns the seconds it took and the
+    peak RSS of the process, in MB. Runs in a new process, so the peak RSS
+    is not affected by the other benchmarks."""
+
+    function = ANALYZERS[analyzer][0]
+    start = time.perf_counter()
+    for filepath in filepaths:
+        function(filepath, python_loc)
+    seconds = time.perf_counter() - start
+
+    # ru_maxrss is in KB on Linux, but in bytes on macOS:
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_rss_mb = peak_rss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+    return seconds, peak_rss_mb
+
+
+def run_benchmarks(groups: dict, python_loc: str = 'tokenize') -> pd.DataFrame:
+
+    rows = []
+    # spawn starts each process from scratch, without the memory of this
+    # process:
+    context = get_context("spawn")
+
+    for analyzer, (_, file_type) in ANALYZERS.items():
+        for group, filepaths in groups.items():
+            if file_type is not None and not group.startswith(file_type):
+                continue
+
+            with ProcessPoolExecutor(max_workers=1,
+                                     mp_context=context) as executor:
+                seconds, peak_rss_mb = executor.submit(
+                    run_benchmark, analyzer, filepaths, python_loc).result()
+
+            rows.append({"analyzer": analyzer, "group": group,
+                         "files": len(filepaths),
+                         "seconds": round(seconds, 4),
+                         "files_per_second": round(len(filepaths) / seconds, 2),
+                         "peak_rss_mb": round(peak_rss_mb, 1)})
+            print(f"{analyzer} on {group}: {rows[-1]['files_per_second']} "
+                  f"files/s, peak RSS {rows[-1]['peak_rss_mb']} MB")
+
+    return pd.DataFrame.from_records(rows)
+
+
+def run_scaling_check(sizes=SCALING_SIZES, seed: int = 0) -> pd.DataFrame:
+    """Times the analyzers of SCALING_ANALYZERS over Python sources with
+    each number of functions of sizes, in this process"""
+
+    rng = random.Random(seed)
+    sources = {size: generate_python_source(rng, size) for size in sizes}
+
+    rows = []
+    for analyzer, function in SCALING_ANALYZERS.items():
+        base_seconds_per_function = None
+        for size in sizes:
+            start = time.perf_counter()
+            function(sources[size])
+            seconds = time.perf_counter() - start
+
+            seconds_per_function = seconds / size
+            if base_seconds_per_function is None:
+                base_seconds_per_function = seconds_per_function
+            ratio = seconds_per_function / base_seconds_per_function
+
+            rows.append({"analyzer": analyzer, "functions": size,
+                         "lines": len(sources[size].splitlines()),
+                         "seconds": round(seconds, 4),
+                         "relative_seconds_per_function": round(ratio, 2)})
+
+        if ratio > SUPERLINEAR_RATIO:
+            print(f"{analyzer} is superlinear: {ratio:.2f}x the time per "
+                  f"function with {sizes[-1]} functions than with {sizes[0]}")
+
+    return pd.DataFrame.from_records(rows)
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--scale", type=float, default=1,
+                        help="multiplies the number of files of each group "
+                        "(default: 1)")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="seed of the generation of the corpus")
+    parser.add_argument("--corpus", type=Path, default=None,
+                        help="directory to generate the corpus in, kept after "
+                        "the benchmark (default: a temporary directory)")
+    parser.add_argument("--python-loc", choices=["scc", "tokenize"],
+                        default="tokenize",
+                        help="how FileComplexity counts the lines of Python "
+                        "files (default: tokenize, which does not need scc)")
+    parser.add_argument("--output", type=Path, default=None,
+                        help="csv file to save the results to (the scaling "
+                        "check is saved as <output>_scaling.csv)")
+    parser.add_argument("--skip-scaling", action="store_true",
+                        help="do not run the scaling check")
+    args = parser.parse_args()
+
+    corpus_directory = args.corpus or Path(tempfile.mkdtemp(prefix="complexity_benchmark_"))
+    groups = generate_corpus(corpus_directory, args.scale, args.seed)
+    print(f"corpus of {sum(len(paths) for paths in groups.values())} files "
+          f"generated in {corpus_directory}")
+
+    try:
+        df_results = run_benchmarks(groups, args.python_loc)
+    finally:
+        if args.corpus is None:
+            shutil.rmtree(corpus_directory)
+
+    print(df_results.to_string(index=False))
+    if args.output is not None:
+        df_results.to_csv(args.output, index=False)
+
+    if not args.skip_scaling:
+        df_scaling = run_scaling_check(seed=args.seed)
+        print(df_scaling.to_string(index=False))
+        if args.output is not None:
+            df_scaling.to_csv(args.output.with_name(
+                args.output.stem + "_scaling.csv"), index=False)
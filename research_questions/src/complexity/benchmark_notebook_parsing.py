@@ -0,0 +1,100 @@
+"""Benchmark of the time spent reading notebooks to gather their loc, comment
+lines and markdown lines, comparing the previous behavior of FileComplexity
+(each metric reading the notebook again, three reads per notebook) with
+parsing each notebook only once, and reading the notebooks with nbformat
+with reading their JSON directly (see utils/notebook_json.py).
+
+By default, it runs over the notebooks of the Kaggle dataset configured in
+configs.json. You can run this script with the command:
+
+python -m research_questions.src.complexity.benchmark_notebook_parsing
+
+from inside the main directory of this project. Use --path to run it over
+another directory of notebooks, and --limit to benchmark only some of them."""
+
+import argparse
+import statistics
+import time
+from pathlib import Path
+
+from research_questions.configs.configs import Configs
+from .notebook_utilities import (ParsedNotebook,
+                                 get_code_and_comment_lines_notebook,
+                                 get_markdown_line_count, parse_notebook,
+                                 read_notebook_nbformat)
+
+
+def parse_three_times(filepath):
+    """Reads the notebook once per metric, as FileComplexity used to do (the
+    third read was done by complexity_notebook), with nbformat."""
+
+    get_code_and_comment_lines_notebook(
+        filepath, ParsedNotebook(read_notebook_nbformat(filepath)))
+    get_markdown_line_count(filepath,
+                            ParsedNotebook(read_notebook_nbformat(filepath)))
+    ParsedNotebook(read_notebook_nbformat(filepath))
+
+
+def parse_once(filepath):
+    notebook = parse_notebook(filepath)
+    get_code_and_comment_lines_notebook(filepath, notebook)
+    get_markdown_line_count(filepath, notebook)
+
+
+def parse_once_nbformat(filepath):
+    """Reads the notebook once, with nbformat, as parse_notebook used to do"""
+
+    notebook = ParsedNotebook(read_notebook_nbformat(filepath))
+    get_code_and_comment_lines_notebook(filepath, notebook)
+    get_markdown_line_count(filepath, notebook)
+
+
+def time_per_notebook(function, notebook_paths):
+    """Returns the seconds spent by function on each notebook"""
+
+    times = []
+    for filepath in notebook_paths:
+        start = time.perf_counter()
+        try:
+            function(filepath)
+        except Exception as e:
+            print(f"{filepath}: {e}")
+        times.append(time.perf_counter() - start)
+
+    return times
+
+
+def print_times(label, times):
+    print(f"{label}: total {sum(times):.2f} s, "
+          f"mean {statistics.mean(times) * 1000:.2f} ms/notebook, "
+          f"median {statistics.median(times) * 1000:.2f} ms/notebook")
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--path", type=Path, default=None,
+                        help="directory of notebooks (default: the Kaggle "
+                        "dataset of configs.json)")
+    parser.add_argument("--limit", type=int, default=None,
+                        help="maximum number of notebooks to benchmark")
+    args = parser.parse_args()
+
+    path = args.path or Path(Configs().kaggle_dataset)
+    notebook_paths = sorted(str(filepath) for filepath in path.rglob("*.ipynb"))
+    notebook_paths = notebook_paths[:args.limit]
+    print(f"benchmarking {len(notebook_paths)} notebooks from {path}")
+
+    # the first read loads the nbformat schemas, so it is not timed:
+    time_per_notebook(parse_once_nbformat, notebook_paths[:1])
+
+    before = time_per_notebook(parse_three_times, notebook_paths)
+    after = time_per_notebook(parse_once_nbformat, notebook_paths)
+    json_reader = time_per_notebook(parse_once, notebook_paths)
+
+    print_times("before (three reads)", before)
+    print_times("after (one read)", after)
+    print(f"speedup: {sum(before) / sum(after):.2f}x")
+    print_times("one read of the JSON, without nbformat", json_reader)
+    print(f"speedup of the JSON reader over nbformat: "
+          f"{sum(after) / sum(json_reader):.2f}x")
@@ -0,0 +1,73 @@
+"""Checkpoints of the complexity analysis of a split. The results of each
+repository are appended to a JSON Lines file as soon as the repository is
+processed (one line per repository), so an interrupted run can be resumed
+by skipping the repositories already in the file, and the results of the
+split do not need to be kept in memory until the end of the run."""
+
+import json
+import os
+from pathlib import Path
+
+
+class Checkpoint:
+
+    def __init__(self, path, resume=False):
+        """path: the JSON Lines file of the checkpoint.
+        resume: when True, the repositories already saved in the file are
+        kept. Otherwise, the file is started from scratch."""
+
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # byte offset of the line of each saved repository:
+        self.offsets = {}
+
+        if resume and self.path.exists():
+            self.load_offsets()
+        else:
+            open(self.path, "w").close()
+
+    def load_offsets(self):
+        """Finds the repositories saved in the file. An incomplete last line,
+        written when a run was interrupted, is removed from the file."""
+
+        valid_size = 0
+        with open(self.path, "rb") as f:
+            for line in iter(f.readline, b""):
+                try:
+                    repository = json.loads(line)["repository"]
+                except (ValueError, KeyError):
+                    break
+                if not line.endswith(b"\n"):
+                    break
+                self.offsets[repository] = valid_size
+                valid_size += len(line)
+
+        with open(self.path, "r+b") as f:
+            f.truncate(valid_size)
+
+    def completed(self) -> set:
+        """Names of the repositories already saved"""
+
+        return set(self.offsets)
+
+    def append(self, repository: str, results: list):
+        """Saves the results of a repository"""
+
+        line = json.dumps({"repository": repository, "results": results})
+
+        with open(self.path, "ab") as f:
+            self.offsets[repository] = f.tell()
+            f.write(line.encode("utf-8") + b"\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def iter_results(self, repositories):
+        """Yields the saved results of the given repositories, in the order
+        of the repositories, reading one repository at a time."""
+
+        with open(self.path, "rb") as f:
+            for repository in repositories:
+                if repository not in self.offsets:
+                    continue
+                f.seek(self.offsets[repository])
+                yield from json.loads(f.readline())["results"]
@@ -6,9 +6,7 @@ If the average cyclomatic complexity is zero, it to adjustments to the source co
 for the library to return a more correct result."""
 
 from lizard import analyze_file
-import os
-import tempfile
-from .notebook_utilities import read_notebook
+from .notebook_utilities import parse_notebook
 
 
 def add_function_to_fix_complexity(source_code, path_name):
@@ -21,6 +19,20 @@ def add_function_to_fix_complexity(source_code, path_name):
 
 
 
+def format_function_result(function, filename):
+    """Metrics of a function detected by Lizard library: its cyclomatic
+    complexity, lines of code without comments (nloc), number of tokens and
+    number of parameters"""
+
+    return {"filename": str(filename),
+            "function_name": function.name,
+            "function_cyclomatic_complexity": function.cyclomatic_complexity,
+            "function_nloc": function.nloc,
+            "function_token_count": function.token_count,
+            "function_parameter_count": function.parameter_count
+            }
+
+
 def get_function_and_cyclomatic_complexity(source_code: str, path_name: str):
     
     complexity_results = analyze_file.analyze_source_code(path_name, source_code)
@@ -36,42 +48,30 @@ def get_function_and_cyclomatic_complexity(source_code: str, path_name: str):
         # getting the result for each function detected by Lizard library:
         for function in complexity_results.function_list:
             
-            function_result = {"filename": str(path_name),
-                                "function_name": function.name,
-                                "function_cyclomatic_complexity": function.cyclomatic_complexity
-                                }
-            
-            function_results.append(function_result)
+            function_results.append(format_function_result(function,
+                                                            path_name))
         
     return function_results, avg_cyclomatic_complexity_file
 
-def complexity_notebook(filepath):
-    
-    notebook = read_notebook(filepath)
-    code_cells = [cell['source'] for cell in notebook.cells if cell.cell_type == 'code']
+def complexity_notebook(filepath, notebook=None):
+    """notebook: the ParsedNotebook of filepath, if it was already parsed"""
+
+    if notebook is None:
+        notebook = parse_notebook(filepath)
     # getting the code content of the notebook cells:
-    combined_code = '\n'.join(code_cells)
+    combined_code = notebook.source_code
 
-    # creating a temp file to parse the notebooks with lizard:
-    with tempfile.NamedTemporaryFile(suffix='.py', delete=False) as temp_file:
-        temp_file.write(combined_code.encode())
-        temp_file_path = temp_file.name
+    # the code of the notebook is parsed in memory by lizard. The .py
+    # suffix makes lizard parse it as Python code:
+    lizard_path = str(filepath) + ".py"
 
     function_results = []
-    complexity_results = analyze_file(temp_file_path)
+    complexity_results = analyze_file.analyze_source_code(lizard_path, combined_code)
 
     # fixing zero complexity returned by Lizard library:
     if complexity_results.average_cyclomatic_complexity == 0:
-    
-        combined_code = "def main():\n" + combined_code
-
-        # creating a temp file to parse the notebooks with lizard:
-        with tempfile.NamedTemporaryFile(suffix='.py', delete=False) as temp_file:
-            temp_file.write(combined_code.encode())
-            temp_file_path = temp_file.name
-
 
-        complexity_results = analyze_file(temp_file_path)
+        complexity_results = add_function_to_fix_complexity(combined_code, lizard_path)
         
     
     avg_cyclomatic_complexity_file = complexity_results.average_cyclomatic_complexity
@@ -79,14 +79,7 @@ def complexity_notebook(filepath):
     for function in complexity_results.function_list:
         # getting the result for each function detected by Lizard library:
 
-        function_result = {"filename": str(filepath),
-                            "function_name": function.name,
-                            "function_cyclomatic_complexity": function.cyclomatic_complexity
-                            }
-        
-        function_results.append(function_result)
-
-    os.remove(temp_file_path)
+        function_results.append(format_function_result(function, filepath))
         
     return function_results, avg_cyclomatic_complexity_file
 
@@ -108,12 +101,8 @@ def get_function_and_cyclomatic_complexity(source_code: str, path_name: str):
         for function in complexity_results.function_list:
         # getting the result for each function detected by Lizard library:
             
-            function_result = {"filename": str(path_name),
-                                "function_name": function.name,
-                                "function_cyclomatic_complexity": function.cyclomatic_complexity
-                                }
-            
-            function_results.append(function_result)
+            function_results.append(format_function_result(function,
+                                                            path_name))
             
         
     return function_results, avg_cyclomatic_complexity_file
\ No newline at end of file
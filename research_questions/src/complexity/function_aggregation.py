@@ -0,0 +1,157 @@
+"""Aggregations of the table of functions saved by complexity.main
+(data_all_repos/<split>_functions.csv), so the distribution of the
+complexity of the functions can be analyzed without running lizard again.
+All the aggregations are vectorized with pandas/numpy groupby operations.
+
+You can print the aggregations per split, or per repository of each split,
+with the commands:
+
+python -m research_questions.src.complexity.function_aggregation
+python -m research_questions.src.complexity.function_aggregation --by repository --output functions_per_repository.csv
+
+from inside the main directory of this project."""
+
+import argparse
+from pathlib import Path
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from .result_writer import FUNCTION_COLUMN_TYPES
+
+SPLITS = ('SE_py', 'Educational_py', 'Educational_nb', 'SE_nb', 'Kaggle')
+
+DEFAULT_PERCENTILES = (0.5, 0.75, 0.9, 0.99)
+
+
+def load_function_metrics(split: str, output_format: str = 'csv',
+                          directory: Path = None) -> pd.DataFrame:
+    """Reads the table of functions of a split, adding the split and the
+    repository of each function as columns."""
+
+    if directory is None:
+        directory = Path(Path.cwd(), "research_questions",
+                         "src", "complexity", "data_all_repos")
+
+    filepath = Path(directory, split + "_functions." + output_format)
+    if output_format == 'parquet':
+        df_functions = pd.read_parquet(filepath)
+    else:
+        df_functions = pd.read_csv(filepath)
+    # the types are lost when a split has no functions:
+    df_functions = df_functions.astype(FUNCTION_COLUMN_TYPES)
+
+    df_functions["split"] = split
+    df_functions["repository"] = get_repository(df_functions["filepath"])
+
+    return df_functions
+
+
+def get_repository(filepaths: pd.Series) -> pd.Series:
+    """Repository (owner/name) of each filepath, as formatted by
+    complexity.main. Files that are not inside a repository, such as the
+    Kaggle notebooks, have no repository."""
+
+    return filepaths.str.extract(r"^/?([^/]+/[^/]+)/", expand=False)
+
+
+def aggregate_functions(df_functions: pd.DataFrame, by: List[str] = ("split",),
+                        percentiles=DEFAULT_PERCENTILES) -> pd.DataFrame:
+    """Aggregates the cyclomatic complexity (CCN) of the functions per
+    group: number of functions, percentiles and max of the CCN, and the mean
+    CCN weighted by the nloc of the functions. The nloc, token count and
+    number of parameters are summarized by their mean and max.
+    Args:
+        df_functions: the table of functions (see load_function_metrics)
+        by: columns defining the groups, e.g. ["split", "repository"]
+        percentiles: percentiles of the CCN, between 0 and 1
+    Returns:
+        df_aggregated: a DataFrame with one row per group
+    """
+
+    by = list(by)
+    # rows with missing values (e.g. functions of files outside a
+    # repository when grouping by repository) are not grouped:
+    df_functions = df_functions.dropna(subset=by + ["cyclomatic_complexity"])
+    grouped = df_functions.groupby(by, sort=True)
+
+    df_aggregated = grouped.agg(
+        num_functions=("cyclomatic_complexity", "size"),
+        max_cyclomatic_complexity=("cyclomatic_complexity", "max"),
+        mean_cyclomatic_complexity=("cyclomatic_complexity", "mean"),
+        mean_nloc=("nloc", "mean"),
+        max_nloc=("nloc", "max"),
+        mean_token_count=("token_count", "mean"),
+        mean_parameter_count=("parameter_count", "mean"),
+        max_parameter_count=("parameter_count", "max"),
+    )
+
+    # all the percentiles are computed in a single pass over the groups:
+    df_percentiles = grouped["cyclomatic_complexity"].quantile(
+        list(percentiles)).unstack()
+    df_percentiles.columns = [f"p{round(percentile * 100):g}_cyclomatic_complexity"
+                              for percentile in df_percentiles.columns]
+
+    # weighted mean: sum(ccn * nloc) / sum(nloc) of each group:
+    ccn = df_functions["cyclomatic_complexity"].to_numpy(dtype=np.float64)
+    nloc = df_functions["nloc"].to_numpy(dtype=np.float64, na_value=0)
+    weighted_sums = pd.DataFrame({"weighted_ccn": ccn * nloc, "nloc": nloc},
+                                 index=df_functions.index)
+    weighted_sums = weighted_sums.groupby([df_functions[column] for column in by],
+                                          sort=True).sum()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        df_aggregated["nloc_weighted_cyclomatic_complexity"] = (
+            weighted_sums["weighted_ccn"] / weighted_sums["nloc"]).replace(
+                np.inf, np.nan)
+
+    return df_aggregated.join(df_percentiles).reset_index()
+
+
+def aggregate_splits(splits=SPLITS, by: List[str] = ("split",),
+                     output_format: str = 'csv', directory: Path = None,
+                     percentiles=DEFAULT_PERCENTILES) -> pd.DataFrame:
+    """Loads the tables of functions of the splits (skipping the ones not
+    generated yet) and aggregates them (see aggregate_functions)."""
+
+    all_functions = []
+    for split in splits:
+        try:
+            all_functions.append(load_function_metrics(split, output_format,
+                                                       directory))
+        except FileNotFoundError as e:
+            print(e)
+
+    if not all_functions:
+        return pd.DataFrame()
+
+    return aggregate_functions(pd.concat(all_functions, ignore_index=True),
+                               by, percentiles)
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(
+        description="Aggregates the complexity of the functions of the splits.")
+    parser.add_argument("--splits", nargs="*", default=list(SPLITS),
+                        help="splits to aggregate (default: all)")
+    parser.add_argument("--by", choices=["split", "repository"],
+                        default="split",
+                        help="aggregate per split (default) or per "
+                        "repository of each split")
+    parser.add_argument("--output-format", choices=["csv", "parquet"],
+                        default="csv",
+                        help="format of the tables of functions")
+    parser.add_argument("--output", type=Path, default=None,
+                        help="csv file to save the aggregations to")
+    args = parser.parse_args()
+
+    by = ["split"] if args.by == "split" else ["split", "repository"]
+    df_aggregated = aggregate_splits(args.splits, by, args.output_format)
+
+    if args.output is not None:
+        df_aggregated.to_csv(args.output, index=False)
+    else:
+        with pd.option_context("display.max_columns", None,
+                               "display.width", 200):
+            print(df_aggregated)
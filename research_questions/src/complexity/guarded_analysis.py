@@ -0,0 +1,132 @@
+"""Runs FileComplexity in a separate worker process, with a wall-clock limit
+per file and a limit on the memory of the worker, so a pathological file
+(e.g. a generated notebook or a minified Python file that makes lizard or
+ast run for minutes) can not stall the analysis of a whole split.
+
+The worker process is started once and reused for all the files. When a file
+exceeds the time limit, or the worker dies, the worker is killed and started
+again for the next file, and the file is recorded with the reason in its
+errors column (TIMEOUT_EXCEEDED, MEMORY_LIMIT_EXCEEDED or WORKER_DIED).
+The memory limit (RLIMIT_AS) is only available on Unix."""
+
+import multiprocessing
+import os
+
+from .FileComplexity import FileComplexity, MEMORY_LIMIT_EXCEEDED
+from .profiler import add_profile, collect_profile, enable_profiling, is_profiling
+
+TIMEOUT_EXCEEDED = "timeout_exceeded"
+WORKER_DIED = "analysis_worker_died"
+
+# one analyzer (and worker process) per process and limits, since the
+# parallel workers of complexity.main each need their own:
+_analyzers = {}
+
+
+def analysis_worker(connection, memory_limit=None):
+    """Loop of the worker process: analyzes the files received through the
+    connection until it is closed"""
+
+    if memory_limit is not None:
+        import resource
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+
+    # the forked worker inherits the stages timed by the parent process so
+    # far, which the parent collects itself:
+    collect_profile()
+
+    while True:
+        try:
+            request = connection.recv()
+        except EOFError:
+            break
+
+        filepath, scc_result, python_loc, profiling = request
+        enable_profiling(profiling)
+        # MemoryError is recorded in the errors by FileComplexity:
+        complexity_results = FileComplexity(filepath, scc_result=scc_result,
+                                            python_loc=python_loc)
+        # the time of the stages (when profiling) is sent back with the
+        # results:
+        connection.send((complexity_results.to_dict(),
+                         complexity_results.scc_failed, collect_profile()))
+
+
+class GuardedAnalyzer:
+
+    def __init__(self, timeout=None, memory_limit=None):
+        """timeout: seconds the analysis of a file can take. None for no
+        limit.
+        memory_limit: bytes of (virtual) memory the worker process can use.
+        None for no limit."""
+
+        self.timeout = timeout
+        self.memory_limit = memory_limit
+        self.process = None
+        self.connection = None
+
+    def start(self):
+
+        self.connection, worker_connection = multiprocessing.Pipe()
+        # the worker is a daemon, so it never outlives this process:
+        self.process = multiprocessing.Process(
+            target=analysis_worker, args=(worker_connection, self.memory_limit),
+            daemon=True)
+        self.process.start()
+        worker_connection.close()
+
+    def stop(self):
+
+        if self.process is None:
+            return
+
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join()
+        self.connection.close()
+        self.process = None
+        self.connection = None
+
+    def analyze(self, filepath, scc_result=None, python_loc='scc'):
+        """Analyzes a file in the worker process (see FileComplexity).
+        Returns the results of the file, as in FileComplexity.to_dict, and
+        whether scc failed to read it."""
+
+        if self.process is None:
+            self.start()
+
+        try:
+            self.connection.send((str(filepath), scc_result, python_loc,
+                                  is_profiling()))
+            if self.connection.poll(self.timeout):
+                file_results, scc_failed, profile = self.connection.recv()
+                add_profile(profile)
+                return file_results, scc_failed
+            reason = TIMEOUT_EXCEEDED
+
+        except (EOFError, OSError):
+            # with a memory limit, the worker usually dies when an
+            # allocation fails outside of Python code:
+            reason = (WORKER_DIED if self.memory_limit is None
+                      else MEMORY_LIMIT_EXCEEDED)
+
+        print(f"e5: {reason} analyzing {filepath}")
+        # the worker is started again for the next file:
+        self.stop()
+
+        failed_results = FileComplexity(str(filepath), python_loc=python_loc,
+                                        analyze=False)
+        failed_results.errors = reason
+
+        return failed_results.to_dict(), False
+
+
+def get_guarded_analyzer(timeout=None, memory_limit=None) -> GuardedAnalyzer:
+    """Returns the GuardedAnalyzer with the given limits of the current
+    process"""
+
+    key = (os.getpid(), timeout, memory_limit)
+    if key not in _analyzers:
+        _analyzers[key] = GuardedAnalyzer(timeout, memory_limit)
+
+    return _analyzers[key]
@@ -0,0 +1,178 @@
+"""Counts code, comment, blank and docstring lines of Python source code with
+the tokenize module of the standard library, as a replacement of the scc lib
+for Python files. Like scc, docstrings are counted as comments, lines mixing
+code and comments are counted as code, lines inside other multi-line
+strings (blank lines included) are counted as code, and lines continued with
+a backslash are counted as code. IPython magics (e.g. %matplotlib inline or
+!pip install) are counted as code, as scc does.
+
+The counts deliberately differ from scc in some cases:
+
+- scc takes any triple quoted string that starts a line as a docstring, even
+  inside an expression (e.g. the first line of a multi-line string argument),
+  while here a docstring must be a statement made only of the string, as
+  for Python itself. Those lines are counted as code here.
+- scc counts docstrings with a prefix (e.g. a raw string docstring) as code, while here
+  they are counted as docstrings.
+- source code that can not be tokenized (e.g. unterminated strings) is
+  counted looking only at the beginning of each line, so its docstrings are
+  counted as code.
+
+The expected counts of scc for the fixtures of tests/fixtures/line_counter,
+which cover these cases, are checked by tests/test_line_counter.py.
+
+To compare the counts against scc for all the Python files inside a
+directory, run:
+
+python -m research_questions.src.complexity.line_counter /path/to/directory
+
+from inside the main directory of this project."""
+
+import io
+import json
+import re
+import subprocess
+import sys
+import tokenize
+from pathlib import Path
+
+# tokens that do not make a line count as code:
+NON_CODE_TOKENS = {tokenize.COMMENT, tokenize.NL, tokenize.NEWLINE,
+                   tokenize.INDENT, tokenize.DEDENT, tokenize.ENDMARKER}
+
+# a string is a docstring candidate when it is triple quoted, as in scc:
+TRIPLE_QUOTED_STRING = re.compile(r'^[a-zA-Z]*("""|\'\'\')')
+
+
+def count_python_lines(source_code: str) -> dict:
+    """Classifies each line of the source code as code, comment, blank or
+    docstring. Returns a dict with the number of lines of each kind."""
+
+    lines = source_code.splitlines()
+    code_lines, comment_lines, docstring_lines = set(), set(), set()
+
+    try:
+        tokens = list(tokenize.generate_tokens(
+            io.StringIO(source_code).readline))
+    except (tokenize.TokenError, SyntaxError):
+        return count_lines_without_tokens(lines)
+
+    # the previous and next significant tokens, to detect statements made
+    # only of a string (docstrings):
+    previous_type = tokenize.NEWLINE
+    next_types = next_significant_types(tokens)
+
+    for position, token in enumerate(tokens):
+        start_line, end_line = token.start[0], token.end[0]
+
+        if token.type == tokenize.COMMENT:
+            comment_lines.add(start_line)
+
+        elif token.type not in NON_CODE_TOKENS:
+            covered_lines = range(start_line, end_line + 1)
+
+            if (token.type == tokenize.STRING
+                    and previous_type in (tokenize.NEWLINE, tokenize.INDENT,
+                                          tokenize.DEDENT)
+                    and next_types[position] in (tokenize.NEWLINE,
+                                                 tokenize.ENDMARKER)
+                    and TRIPLE_QUOTED_STRING.match(token.string)):
+                docstring_lines.update(covered_lines)
+            else:
+                code_lines.update(covered_lines)
+
+        if token.type not in (tokenize.COMMENT, tokenize.NL):
+            previous_type = token.type
+
+    code = 0
+    comment = 0
+    docstring = 0
+    blank = 0
+    for line_number, line in enumerate(lines, start=1):
+        if line_number in code_lines:
+            code += 1
+        elif line_number in docstring_lines:
+            docstring += 1
+        elif line_number in comment_lines:
+            comment += 1
+        elif not line.strip():
+            blank += 1
+        else:
+            # e.g. a line continuation made only of a backslash:
+            code += 1
+
+    return {"code": code, "comment": comment, "blank": blank,
+            "docstring": docstring}
+
+
+def next_significant_types(tokens) -> list:
+    """Returns, for each token, the type of the first token after it that is
+    not a comment or a non-logical newline, computed in a single reverse
+    pass over the tokens."""
+
+    next_types = [tokenize.ENDMARKER] * len(tokens)
+    next_type = tokenize.ENDMARKER
+    for position in range(len(tokens) - 1, -1, -1):
+        next_types[position] = next_type
+        if tokens[position].type not in (tokenize.COMMENT, tokenize.NL):
+            next_type = tokens[position].type
+
+    return next_types
+
+
+def count_lines_without_tokens(lines) -> dict:
+    """Counts lines of source code that can not be tokenized (e.g. Python 2
+    code), looking only at the beginning of each line."""
+
+    code, comment, blank = 0, 0, 0
+    for line in lines:
+        stripped_line = line.strip()
+        if not stripped_line:
+            blank += 1
+        elif stripped_line.startswith("#"):
+            comment += 1
+        else:
+            code += 1
+
+    return {"code": code, "comment": comment, "blank": blank,
+            "docstring": 0}
+
+
+def compare_with_scc(directory: Path):
+    """Counts the lines of all the Python files inside a directory with
+    both count_python_lines and scc, and prints the files in which the
+    counts differ."""
+
+    total_files = 0
+    mismatches = 0
+
+    for filepath in sorted(directory.rglob("*.py")):
+        if not filepath.is_file():
+            continue
+        source_code = open(filepath, "r", encoding="utf-8",
+                           errors="replace").read()
+        counts = count_python_lines(source_code)
+
+        output = subprocess.check_output(['scc', '--format', 'json',
+                                          str(filepath)])
+        scc_results = json.loads(output.decode('UTF-8'))
+        if not scc_results:
+            continue
+
+        total_files += 1
+        expected = (scc_results[0]['Code'], scc_results[0]['Comment'],
+                    scc_results[0]['Blank'])
+        obtained = (counts['code'], counts['comment'] + counts['docstring'],
+                    counts['blank'])
+
+        if expected != obtained:
+            mismatches += 1
+            print(f"{filepath}: scc (code, comment, blank) = {expected}, "
+                  f"tokenize = {obtained}")
+
+    print(f"{mismatches} of {total_files} Python files have different counts")
+
+
+if __name__ == "__main__":
+
+    compare_with_scc(Path(sys.argv[1]))
@@ -18,33 +18,105 @@ external storage device directly. That is why this script copy file by file
 of to the current working directory in temporary folders, that are excluded
 in the end of the execution of this script. Thus, you can use this script
 to run loc in data you keeP in an external hard disk, as an example.
+If your repositories are readable by scc (e.g. they are inside your home
+directory), run the script with --in-place to skip the copies: files are
+then only copied when scc fails to read them, and the number of copied files
+is printed for each split.
 
 This script can take hours to run. The scc lib was installed with snap, for 
-Ubuntu.
+Ubuntu. To speed it up, the repositories of a split can be analyzed by a
+pool of worker processes (one per core by default), e.g.:
 
+python -m research_questions.src.complexity.main --workers 8
 
+Use --workers 1 to run the original serial loop. Both modes generate the same
+csv files.
 
 """
 
-import json
-import sys
-import signal
+import argparse
+import hashlib
 import os
 from pathlib import Path
-import subprocess
 import shutil
-import pandas as pd
-from typing import List
+from typing import Iterable
 import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed, wait, FIRST_COMPLETED
 
 from research_questions.configs.configs import Configs
+from research_questions.src.utils.scc import batched, run_scc_batch
+from research_questions.src.utils.walker import walk_files
+from research_questions.src.utils.manifest import open_manifest
 from .FileComplexity import *
+from .result_cache import cache_key, open_result_cache
+from .checkpoint import Checkpoint
+from .guarded_analysis import get_guarded_analyzer
+from .profiler import collect_profile, enable_profiling, save_profile, stage
+from .result_writer import ResultWriter, OUTPUT_FILE_TYPES, OUTPUT_FORMATS, FUNCTION_COLUMN_TYPES
 
 config = Configs()
 
 
 
-def get_complexity_metrics(source_dir, destination_dir, split):
+# suffixes of the only file types saved in the csv files (python files and
+# notebooks), so other files are not even analyzed:
+INCLUDED_SUFFIXES = ('.py', '.ipynb')
+# suffixes of files never analyzed:
+EXCLUDED_SUFFIXES = ('.gitignore', '.png', '.jpg', '.jpeg', '.svg')
+# directories never walked:
+PRUNED_DIRECTORIES = ('.git', 'node_modules')
+
+
+class AnalysisOptions:
+    """Options of the analysis of the files, shared by the functions of this
+    script and passed to the worker processes.
+        in_place: when True, the files are analyzed directly from where they
+        are stored, and only copied when scc fails to read them.
+        scc_batch_size: number of files passed to a single scc invocation.
+        With 1, scc runs once per file.
+        python_loc: 'scc' or 'tokenize', the way lines of Python files are
+        counted (see FileComplexity).
+        cache_path: path of the ResultCache database consulted before
+        analyzing a file. None disables the cache.
+        included_suffixes, excluded_suffixes, max_file_size: select the
+        files analyzed in each repository (see filter_desired_files).
+        manifest_path: path of the Manifest database the files are queried
+        from, instead of walking the repositories. None disables it.
+        file_timeout, max_memory: limits of seconds and bytes of memory of
+        the analysis of each file (see guarded_analysis). With both None,
+        the files are analyzed in the current process, without limits.
+        profile: when True, the time of each stage of the analysis is
+        measured and saved at the end of each split (see profiler).
+    """
+
+    def __init__(self, in_place=False, scc_batch_size=1, python_loc='scc',
+                 cache_path=None, included_suffixes=INCLUDED_SUFFIXES,
+                 excluded_suffixes=EXCLUDED_SUFFIXES, max_file_size=None,
+                 manifest_path=None, file_timeout=None, max_memory=None,
+                 profile=False):
+
+        self.in_place = in_place
+        self.scc_batch_size = scc_batch_size
+        self.python_loc = python_loc
+        self.cache_path = cache_path
+        self.included_suffixes = included_suffixes
+        self.excluded_suffixes = excluded_suffixes
+        self.max_file_size = max_file_size
+        self.manifest_path = manifest_path
+        self.file_timeout = file_timeout
+        self.max_memory = max_memory
+        self.profile = profile
+
+
+def get_complexity_metrics(source_dir, destination_dir, split, workers=1,
+                           in_place=False, scc_batch_size=1, python_loc='scc',
+                           cache_path=None, checkpoint_path=None, resume=False,
+                           included_suffixes=INCLUDED_SUFFIXES,
+                           excluded_suffixes=EXCLUDED_SUFFIXES,
+                           max_file_size=None, manifest_path=None,
+                           file_timeout=None, max_memory=None,
+                           profile=False):
     """Function that copies the files to your current working directory 
     (directory of this project), and uses the scc lib to run
     loc (and also infer the file language). Since scc lib installed with snap 
@@ -54,11 +126,26 @@ def get_complexity_metrics(source_dir, destination_dir, split):
         destination_dir: the directory to copy the desired files to. The files
         are copied one by one, and the loc is always executed in a single file
         at a time.
+        split: name of the split, only used to print the progress.
+        workers: number of worker processes analyzing the repositories in
+        parallel. With 1 worker, the repositories are analyzed serially.
+        in_place, scc_batch_size, python_loc, cache_path, included_suffixes,
+        excluded_suffixes, max_file_size, manifest_path, file_timeout,
+        max_memory, profile: see AnalysisOptions.
+        checkpoint_path: JSON Lines file to which the results of each
+        repository are appended as soon as it is processed (see Checkpoint).
+        resume: when True, the repositories already saved in the checkpoint
+        are not processed again.
         Returns:
         all_complexity_results: a list with the resulting json for a given file in
-        which loc operation was performed
+        which loc operation was performed. With a checkpoint, an iterator
+        that reads the results from the checkpoint file instead.
     """
 
+    options = AnalysisOptions(in_place, scc_batch_size, python_loc, cache_path,
+                              included_suffixes, excluded_suffixes,
+                              max_file_size, manifest_path, file_timeout,
+                              max_memory, profile)
     all_complexity_results = []
     # creating a tmeporary directory, only to copy the files to the current
     # working directory:
@@ -67,122 +154,696 @@ def get_complexity_metrics(source_dir, destination_dir, split):
     os.makedirs(destination_path)
     # counting the processed repositories only to print them in the terminal:
     processed_repo_count = 0
+    # counting the copied files in the in place mode, and the cache hits and
+    # misses:
+    split_stats = Counter()
+    repositories = list(source_dir.iterdir())
+
+    checkpoint = None
+    pending_repositories = repositories
+    if checkpoint_path is not None:
+        checkpoint = Checkpoint(checkpoint_path, resume)
+        completed_repositories = checkpoint.completed()
+        pending_repositories = [repository_dir for repository_dir in repositories
+                                if repository_dir.name not in completed_repositories]
+        processed_repo_count = len(repositories) - len(pending_repositories)
+        if resume:
+            print(f"{processed_repo_count} directories were already processed in split {str(split)}")
+
+    if workers == 1:
+        # iterating through all the repositories:
+        for repository_dir in pending_repositories:
+            repository_results, repository_stats = analyze_repository(
+                repository_dir, source_dir, destination_path, options)
+            if checkpoint is not None:
+                checkpoint.append(repository_dir.name, repository_results)
+            else:
+                all_complexity_results += repository_results
+            split_stats.update(repository_stats)
+
+            processed_repo_count += 1
+            if processed_repo_count % 1 == 0:
+                print(f"{processed_repo_count} directories were processed in split {str(split)}")
+
+    else:
+        # the results arrive in completion order, but they are kept by the
+        # position of their repository, so the csv has the same row order as
+        # the serial loop:
+        results_per_repository = [[] for _ in pending_repositories]
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(analyze_repository, repository_dir,
+                                       source_dir, destination_path,
+                                       options, True): position
+                       for position, repository_dir in enumerate(pending_repositories)}
+
+            for future in as_completed(futures):
+                repository_results, repository_stats = future.result()
+                position = futures[future]
+                if checkpoint is not None:
+                    checkpoint.append(pending_repositories[position].name,
+                                      repository_results)
+                else:
+                    results_per_repository[position] = repository_results
+                split_stats.update(repository_stats)
+
+                processed_repo_count += 1
+                print(f"{processed_repo_count} directories were processed in split {str(split)}")
+
+        for repository_results in results_per_repository:
+            all_complexity_results += repository_results
+
+    print_split_stats(split_stats, split, options)
 
-    # iterating through all the repositories:
-    for repository_dir in source_dir.iterdir():
-        files_to_run_loc = filter_desired_files(repository_dir)
-        
+    # excluding the temporary directory
+    shutil.rmtree(destination_dir)
+
+    if checkpoint is not None:
+        # the results are read from the checkpoint in the order of the
+        # repositories, one repository at a time:
+        all_complexity_results = checkpoint.iter_results(
+            [repository_dir.name for repository_dir in repositories])
+
+    return all_complexity_results
+
+def print_split_stats(split_stats, split, options):
+
+    if options.in_place:
+        print(f"{split_stats['staged_files']} files needed to be copied to be read by scc in split {str(split)}")
+    if options.cache_path is not None:
+        print(f"cache hits: {split_stats['cache_hits']}, cache misses: {split_stats['cache_misses']} in split {str(split)}")
+    if options.profile:
+        save_profile(split_stats, split)
+
+def analyze_repository(repository_dir, source_dir, destination_path,
+                       options=None, own_staging_dir=False):
+    """Gathers the complexity information of the desired files of a single
+    repository.
+    Args:
+        repository_dir: the path of the repository to analyze
+        source_dir: the path which your repositories are stored, only used
+        to format the filepath of the results
+        destination_path: the temporary directory to copy the files to
+        options: the AnalysisOptions of the analysis
+        own_staging_dir: when True, the files are copied to a subdirectory
+        named after the current process id, so that parallel workers never
+        overwrite each other's copies.
+        Returns:
+        repository_results: a list with the complexity results of each file
+        repository_stats: a Counter with the number of files that needed to
+        be copied in the in place mode, and the cache hits and misses
+    """
 
+    if own_staging_dir:
+        destination_path = Path(destination_path, str(os.getpid()))
+        destination_path.mkdir(exist_ok=True)
+
+    if options is None:
+        options = AnalysisOptions()
+
+    files_to_run_loc, manifest_entries = find_desired_files(repository_dir,
+                                                            options)
+
+    return analyze_files(files_to_run_loc, source_dir, destination_path,
+                         options, manifest_entries)
+
+def analyze_files(files_to_run_loc, source_dir, destination_path,
+                  options=None, manifest_entries=None):
+    """Gathers the complexity information of a list of files, looking for
+    their results in the cache first and running scc in batches when
+    configured in options. Returns the results of the files, in the same
+    order of files_to_run_loc, and a Counter with the statistics of the
+    analysis (see analyze_repository). Only the results of python files and
+    notebooks are kept, since they are the only ones saved in the csv
+    files. The hashes of manifest_entries, a dict mapping the files to their
+    ManifestEntry, are used to look for the results in the cache without
+    reading the files, when they were not modified since indexed."""
+
+    if options is None:
+        options = AnalysisOptions()
+    if manifest_entries is None:
+        manifest_entries = {}
+    # set in each worker process, which does not share the state of the
+    # main process:
+    enable_profiling(options.profile)
+
+    results = []
+    stats = Counter()
+    cache = open_result_cache(options.cache_path)
+    files_results = {}
+    cache_keys = {}
+
+    if cache is not None:
         for current_file in files_to_run_loc:
+            entry = manifest_entries.get(current_file)
+            content_hash = None
+            if entry is not None and entry.is_current():
+                content_hash = entry.sha256
+            try:
+                cache_keys[current_file] = cache_key(current_file,
+                                                     options.python_loc,
+                                                     content_hash)
+            except OSError as e:
+                # e.g. a file removed since it was listed, which is recorded
+                # with the error when analyzed:
+                print(e)
+                continue
+            cached_results = cache.get(cache_keys[current_file])
+
+            if cached_results is None:
+                stats['cache_misses'] += 1
+            else:
+                stats['cache_hits'] += 1
+                cached_results['filepath'] = format_filepath(current_file,
+                                                             source_dir)
+                files_results[current_file] = cached_results
+
+    if options.scc_batch_size > 1:
+        # notebooks (and python files, when their lines are counted with
+        # tokenize) are not parsed by scc, so only the other files are
+        # batched:
+        skipped_suffixes = ['.ipynb'] if options.python_loc == 'scc' else ['.ipynb', '.py']
+        scc_files = [current_file for current_file in files_to_run_loc
+                     if current_file.suffix not in skipped_suffixes
+                     and current_file not in files_results]
+
+        for batch in batched(scc_files, options.scc_batch_size):
+            batch_results = analyze_scc_batch(batch, source_dir,
+                                              destination_path, options)
+            files_results.update(batch_results)
+            store_in_cache(cache, cache_keys, batch_results)
 
-            # copy2 ensures the metada of the copied file is kept:
-            copied_file = shutil.copy2(current_file, destination_path)
-            # getting complexity results for the given file:
-            
-            complexity_results = FileComplexity(copied_file)
-            
+    for current_file in files_to_run_loc:
+
+        if current_file in files_results:
+            file_results = files_results[current_file]
+        else:
+            file_results, staged = analyze_file(current_file, source_dir,
+                                                destination_path, options)
+            stats['staged_files'] += staged
+            store_in_cache(cache, cache_keys, {current_file: file_results})
+
+        if file_results and file_results['file_type'] in OUTPUT_FILE_TYPES:
+            results.append(file_results)
+
+    # the time of the stages is summed with the statistics of the split:
+    stats.update(collect_profile())
+
+    return results, stats
+
+def store_in_cache(cache, cache_keys, files_results):
+    """Stores the results of the files in the cache. Results with errors are
+    not stored, so the files are analyzed again in the next run."""
+
+    if cache is None:
+        return
+
+    for current_file, file_results in files_results.items():
+        if file_results and not file_results['errors']:
+            cached_results = dict(file_results)
+            del cached_results['filepath']
+            if current_file in cache_keys:
+                cache.put(cache_keys[current_file], cached_results)
+
+def analyze_scc_batch(batch, source_dir, destination_path, options):
+    """Runs scc once for a batch of files and gathers the complexity
+    information of each file of the batch. Without the in place mode, the
+    files are copied to destination_path, each one inside a subdirectory
+    named after its position in the batch, since files of the same
+    repository can share the same name.
+    Returns the results of the files scc reported, keyed by the path of
+    the file. Files scc did not report are left to be analyzed one by one."""
+
+    if options.in_place:
+        scc_paths = [str(current_file) for current_file in batch]
+    else:
+        copied_batch = []
+        scc_paths = []
+        for position, current_file in enumerate(batch):
+            copy_dir = Path(destination_path, str(position))
+            copy_dir.mkdir(exist_ok=True)
+            try:
+                # copy2 ensures the metada of the copied file is kept:
+                with stage("copy"):
+                    scc_paths.append(shutil.copy2(current_file, copy_dir))
+            except OSError as e:
+                # the file is left to be analyzed one by one, which records
+                # the error:
+                print(e)
+                shutil.rmtree(copy_dir)
+                continue
+            copied_batch.append(current_file)
+        batch = copied_batch
+
+    try:
+        with stage("scc"):
+            scc_results = run_scc_batch(scc_paths, timeout=15 * len(batch))
+    except Exception as e:
+        print(f"Error running scc: {e}")
+        scc_results = {}
+
+    batch_results = {}
+    for current_file, scc_path in zip(batch, scc_paths):
+        if scc_path in scc_results:
+            file_results, _ = get_file_complexity(scc_path, options,
+                                                  scc_results[scc_path])
+            file_results['filepath'] = format_filepath(current_file, source_dir)
+            batch_results[current_file] = file_results
+
+        if not options.in_place:
+            # deleting the copied file, to prevent using too much memory:
+            shutil.rmtree(Path(scc_path).parent)
+
+    return batch_results
 
-            if complexity_results:
+def analyze_file(current_file, source_dir, destination_path, options=None):
+    """Gathers the complexity information of a single file. By default, the
+    file is copied to destination_path (see the limitation of the scc lib
+    described in this module). In the in place mode, the file is read from
+    where it is stored, and the copy is only done when scc fails to read it.
+    Returns the results of the file and whether a copy was needed in the
+    in place mode."""
 
-                file_results = complexity_results.to_dict()
-                filepath_str = str(current_file).split(str(source_dir))[-1]
-                file_results['filepath'] = filepath_str.replace("_____", "/")
-                all_complexity_results.append(file_results)
+    if options is None:
+        options = AnalysisOptions()
+
+    staged = False
+    file_results = None
+
+    if options.in_place:
+        file_results, staged = get_file_complexity(current_file, options)
+
+    if not options.in_place or staged:
+        try:
+            # copy2 ensures the metada of the copied file is kept:
+            with stage("copy"):
+                copied_file = shutil.copy2(current_file, destination_path)
+        except OSError as e:
+            # e.g. a file removed since it was listed, recorded with the
+            # error instead of stopping the split:
+            print(f"e6: {e}")
+            failed_results = FileComplexity(str(current_file),
+                                            python_loc=options.python_loc,
+                                            analyze=False)
+            failed_results.errors = str(e)
+            file_results = failed_results.to_dict()
+        else:
+            # getting complexity results for the given file:
+            file_results, _ = get_file_complexity(copied_file, options)
             # deleting the copied file, to prevent using too much memory:
             os.remove(copied_file)
 
-        processed_repo_count += 1
-        if processed_repo_count % 1 == 0:
-            print(f"{processed_repo_count} directories were processed in split {str(split)}")
+    if file_results:
 
-    # excluding the temporary directory
-    shutil.rmtree(destination_dir)
+        file_results['filepath'] = format_filepath(current_file, source_dir)
 
-    return all_complexity_results
+    return file_results, staged
 
-def get_complexity_metrics_kaggle(source_dir, destination_dir, split):
+def get_file_complexity(filepath, options, scc_result=None):
+    """Runs FileComplexity for a file, in the worker process of
+    guarded_analysis when options limit the time or memory of the
+    analysis. Returns the results of the file (see FileComplexity.to_dict)
+    and whether scc failed to read it."""
 
-    all_complexity_results = []
-    # creating a temporary directory, only to copy the files to the current
-    # working directory:
-    destination_path = Path(destination_dir)
-    os.makedirs(destination_path)
-    # counting the processed repositories only to print them in the terminal:
-    processed_file_count = 0
-    files_to_run_loc = [filepath for filepath in source_dir.iterdir()]
-    print(f'number of files to be processed: {len(files_to_run_loc)}')
+    if options.file_timeout is None and options.max_memory is None:
+        complexity_results = FileComplexity(str(filepath), scc_result=scc_result,
+                                            python_loc=options.python_loc)
 
-    for current_file in files_to_run_loc:
+        return complexity_results.to_dict(), complexity_results.scc_failed
+
+    analyzer = get_guarded_analyzer(options.file_timeout, options.max_memory)
+
+    return analyzer.analyze(filepath, scc_result, options.python_loc)
 
-        # copy2 ensures the metada of the copied file is kept:
-        copied_file = shutil.copy2(current_file, destination_path)
+def format_filepath(current_file, source_dir):
+    """Formats the path of a file, relative to source_dir, as saved in the
+    csv files"""
 
-        complexity_results = FileComplexity(copied_file)
-        
+    filepath_str = str(current_file).split(str(source_dir))[-1]
 
-        if complexity_results:
+    return filepath_str.replace("_____", "/")
 
-            file_results = complexity_results.to_dict()
-            filepath_str = str(current_file).split(str(source_dir))[-1]
-            file_results['filepath'] = filepath_str.replace("_____", "/")
-            all_complexity_results.append(file_results)
-        # deleting the copied file, to prevent using too much memory:
-        os.remove(copied_file)
+def get_complexity_metrics_kaggle(source_dir, destination_dir, split,
+                                  in_place=False, python_loc='scc',
+                                  cache_path=None,
+                                  included_suffixes=INCLUDED_SUFFIXES,
+                                  excluded_suffixes=EXCLUDED_SUFFIXES,
+                                  max_file_size=None, manifest_path=None,
+                                  file_timeout=None, max_memory=None,
+                                  profile=False, workers=1, chunk_size=100,
+                                  checkpoint_path=None, resume=False):
+    """Gathers the complexity information of the files of a flat directory,
+    such as the Kaggle dataset (a single directory of notebooks). The files
+    are streamed from the directory in chunks, which are analyzed by a pool
+    of worker processes, so the directory is never listed at once.
+    Args:
+        source_dir: the directory with the files
+        destination_dir: the temporary directory to copy the files to
+        split: name of the split, only used to print the progress.
+        workers: number of worker processes analyzing the chunks in
+        parallel. With 1 worker, the chunks are analyzed serially.
+        chunk_size: number of files of each chunk. At most two chunks per
+        worker are waiting to be analyzed at a time.
+        checkpoint_path: JSON Lines file to which the results of each chunk
+        are appended as soon as it is analyzed (see Checkpoint), so they are
+        not kept in memory.
+        resume: when True, the chunks already saved in the checkpoint are
+        skipped. Chunks are named after the files they have, so a chunk is
+        only skipped if the directory still lists the same files in it.
+        in_place, python_loc, cache_path, included_suffixes,
+        excluded_suffixes, max_file_size, manifest_path, file_timeout,
+        max_memory, profile: see AnalysisOptions.
+    Returns:
+        all_complexity_results: a list with the results of each file, in the
+        order of the files in the directory. With a checkpoint, an iterator
+        that reads them from the checkpoint file instead.
+    """
 
+    options = AnalysisOptions(in_place, python_loc=python_loc,
+                              cache_path=cache_path,
+                              included_suffixes=included_suffixes,
+                              excluded_suffixes=excluded_suffixes,
+                              max_file_size=max_file_size,
+                              manifest_path=manifest_path,
+                              file_timeout=file_timeout,
+                              max_memory=max_memory, profile=profile)
+    # creating a temporary directory, only to copy the files to the current
+    # working directory:
+    destination_path = Path(destination_dir)
+    os.makedirs(destination_path)
 
+    checkpoint = None
+    completed_chunks = set()
+    if checkpoint_path is not None:
+        checkpoint = Checkpoint(checkpoint_path, resume)
+        completed_chunks = checkpoint.completed()
+    # names of all the chunks, in their order:
+    chunk_names = []
+    # results of each chunk, by its name, when there is no checkpoint:
+    results_per_chunk = {}
+    split_stats = Counter()
+    processed_chunks = 0
+
+    chunks = batched(iter_desired_files(source_dir, options), chunk_size)
+
+    if workers == 1:
+        for chunk in chunks:
+            chunk_name = get_chunk_name(len(chunk_names), chunk)
+            chunk_names.append(chunk_name)
+            if chunk_name not in completed_chunks:
+                chunk_results, chunk_stats = analyze_chunk(chunk, source_dir,
+                                                           destination_path,
+                                                           options)
+                save_chunk_results(chunk_name, chunk_results, checkpoint,
+                                   results_per_chunk)
+                split_stats.update(chunk_stats)
+            processed_chunks += 1
+            print(f"{processed_chunks} chunks of files were processed in split {str(split)}")
+
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {}
+
+            for chunk in chunks:
+                chunk_name = get_chunk_name(len(chunk_names), chunk)
+                chunk_names.append(chunk_name)
+                if chunk_name in completed_chunks:
+                    processed_chunks += 1
+                    continue
+
+                if len(futures) >= 2 * workers:
+                    # waiting for a chunk to finish before reading more
+                    # files from the directory:
+                    done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        chunk_results, chunk_stats = future.result()
+                        save_chunk_results(futures.pop(future), chunk_results,
+                                           checkpoint, results_per_chunk)
+                        split_stats.update(chunk_stats)
+                        processed_chunks += 1
+                        print(f"{processed_chunks} chunks of files were processed in split {str(split)}")
+
+                futures[executor.submit(analyze_chunk, chunk, source_dir,
+                                        destination_path, options,
+                                        True)] = chunk_name
+
+            for future in as_completed(futures):
+                chunk_results, chunk_stats = future.result()
+                save_chunk_results(futures[future], chunk_results,
+                                   checkpoint, results_per_chunk)
+                split_stats.update(chunk_stats)
+                processed_chunks += 1
+                print(f"{processed_chunks} chunks of files were processed in split {str(split)}")
+
+    if resume:
+        print(f"{len(completed_chunks.intersection(chunk_names))} chunks were already processed in split {str(split)}")
     print(f"all Kaggle dataset notebooks were processed!")
+    print_split_stats(split_stats, split, options)
 
     # excluding the temporary directory
     shutil.rmtree(destination_dir)
 
-    return all_complexity_results
+    if checkpoint is not None:
+        return checkpoint.iter_results(chunk_names)
 
+    all_complexity_results = []
+    for chunk_name in chunk_names:
+        all_complexity_results += results_per_chunk[chunk_name]
 
+    return all_complexity_results
 
-def filter_desired_files(repository: Path) -> list:
+def analyze_chunk(chunk, source_dir, destination_path, options,
+                  own_staging_dir=False):
+    """Gathers the complexity information of a chunk of files, a list of
+    files and their ManifestEntry (or None), as yielded by
+    iter_desired_files. See analyze_repository."""
+
+    if own_staging_dir:
+        destination_path = Path(destination_path, str(os.getpid()))
+        destination_path.mkdir(exist_ok=True)
+
+    files_to_run_loc = [filepath for filepath, _ in chunk]
+    manifest_entries = {filepath: entry for filepath, entry in chunk
+                        if entry is not None}
+
+    return analyze_files(files_to_run_loc, source_dir, destination_path,
+                         options, manifest_entries)
+
+def save_chunk_results(chunk_name, chunk_results, checkpoint, results_per_chunk):
+
+    if checkpoint is not None:
+        checkpoint.append(chunk_name, chunk_results)
+    else:
+        results_per_chunk[chunk_name] = chunk_results
+
+def get_chunk_name(position, chunk):
+    """Name of a chunk of files in the checkpoint: its position and a hash
+    of its files, so a chunk saved before the directory changed is not
+    taken as the chunk in the same position when resuming"""
+
+    files_hash = hashlib.sha1("\n".join(
+        str(filepath) for filepath, _ in chunk).encode("utf-8")).hexdigest()
+
+    return f"chunk_{position}_{files_hash[:16]}"
+
+
+def find_desired_files(directory: Path, options):
+    """Returns the desired files of a directory (see filter_desired_files)
+    and a dict mapping them to their ManifestEntry. The files are queried
+    from the manifest of options when the directory is indexed in it,
+    otherwise the directory is walked (and the dict is empty)."""
+
+    files_to_run_loc = []
+    manifest_entries = {}
+    for filepath, entry in iter_desired_files(directory, options):
+        files_to_run_loc.append(filepath)
+        if entry is not None:
+            manifest_entries[filepath] = entry
+
+    return files_to_run_loc, manifest_entries
+
+def iter_desired_files(directory: Path, options):
+    """Yields the desired files of a directory and their ManifestEntry, as
+    find_desired_files, but one at a time as the directory is walked. The
+    ManifestEntry is None when the directory is not in the manifest."""
+
+    manifest = open_manifest(options.manifest_path)
+    if manifest is not None:
+        entries = manifest.entries(directory, options.included_suffixes,
+                                   options.excluded_suffixes,
+                                   PRUNED_DIRECTORIES, options.max_file_size)
+        if entries is not None:
+            for entry in entries:
+                yield entry.path, entry
+            return
+
+    for filepath in walk_desired_files(directory, options.included_suffixes,
+                                       options.excluded_suffixes,
+                                       options.max_file_size):
+        yield filepath, None
+
+def filter_desired_files(repository: Path,
+                         included_suffixes=INCLUDED_SUFFIXES,
+                         excluded_suffixes=EXCLUDED_SUFFIXES,
+                         max_file_size=None) -> list:
     """Returns files for detecting language, while ignoring .gitignore,
      files inside .git/ directory,and other fyle types, since makes no sense
      to analyze the language of these files.
     Filters the desired files to run loc from each repository path, passed as
-    parameter to this function."""
-
-    desired_files = []
-    for filepath in repository.rglob("*"):
-        # ignoring files inside .git folders, and also ignoring .gitignore files:
+    parameter to this function.
+    The directories in PRUNED_DIRECTORIES are not walked at all, and files
+    are selected by their names before reading anything else from them
+    (see walk_files):
+        included_suffixes: only files with these suffixes are returned. With
+        None, all the files not excluded are returned.
+        excluded_suffixes: files with these (lowercase) suffixes are ignored.
+        max_file_size: files bigger than this number of bytes are ignored.
+        With None, files of any size are returned."""
+
+    return list(walk_desired_files(repository, included_suffixes,
+                                   excluded_suffixes, max_file_size))
+
+def walk_desired_files(repository: Path,
+                       included_suffixes=INCLUDED_SUFFIXES,
+                       excluded_suffixes=EXCLUDED_SUFFIXES,
+                       max_file_size=None):
+    """Yields the files returned by filter_desired_files, one at a time as
+    the repository is walked"""
+
+    # ignoring files inside .git folders (and other unnecessary directories),
+    # without walking them, and also ignoring unnecessary files:
+    for entry in walk_files(repository, included_suffixes, excluded_suffixes,
+                            PRUNED_DIRECTORIES):
         try:
-            if filepath.is_file():
-                # ignroing unnecessary files:
-                if (
-                    filepath.is_file()
-                    and ".git" not in filepath.parts
-                    and not filepath.suffix.lower()
-                    in [".gitignore", ".png", ".jpg", ".jpeg", ".svg"]
-                ):
-                    desired_files.append(filepath)
+            if max_file_size is not None and entry.stat().st_size > max_file_size:
+                continue
         except Exception as e:
             print(e)
             continue
 
-    return desired_files
+        yield Path(entry.path)
 
-def create_csv_complexity(all_loc_resuts: List[dict], split: str):
+def create_csv_complexity(all_loc_resuts: Iterable[dict], split: str,
+                          output_format: str = 'csv'):
     """Save the results of the loc operation ran over all the
     repositories, according to the script they belong, in a csv
-    file."""
-
-    df_results = pd.DataFrame.from_records(all_loc_resuts)
-    df_results = df_results.loc[df_results['file_type'].isin(['python', 'notebook'])]
+    file (or in a parquet file). The results can be any iterable, and are
+    written in batches as they are read. The metrics of each function are
+    saved in a second file, <split>_functions.csv, with one row per
+    function."""
 
     directory_to_save = Path(Path.cwd(), "research_questions",
                              "src", "complexity", "data_all_repos")
 
     directory_to_save.mkdir(parents=True, exist_ok=True)
 
-    csv_filepath = directory_to_save / (split + ".csv")
-    df_results.to_csv(csv_filepath, index=False)
+    filepath = directory_to_save / (split + "." + output_format)
+    functions_filepath = directory_to_save / (split + "_functions." + output_format)
+    with ResultWriter(filepath, output_format) as writer, \
+            ResultWriter(functions_filepath, output_format,
+                         column_types=FUNCTION_COLUMN_TYPES) as functions_writer:
+        for file_results in all_loc_resuts:
+            writer.write(file_results)
+            # results saved in checkpoints of previous versions have no
+            # function metrics:
+            for function_metrics in file_results.get("function_metrics", []):
+                functions_writer.write({"filepath": file_results["filepath"],
+                                        **function_metrics})
+
+def get_checkpoint_path(split: str) -> Path:
+
+    return Path(Path.cwd(), "research_questions", "src", "complexity",
+                "checkpoints", split + ".jsonl")
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Gathers complexity information of all dataset splits.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="number of worker processes analyzing the "
+                        "repositories of a split (default: number of cores). "
+                        "Use 1 to analyze the repositories serially.")
+    parser.add_argument("--in-place", action="store_true",
+                        help="analyze the files directly from the cloned "
+                        "repositories, copying only the files scc cannot "
+                        "read to the temporary folders.")
+    parser.add_argument("--scc-batch-size", type=int, default=100,
+                        help="number of files passed to a single scc "
+                        "invocation (default: 100). Use 1 to run scc once "
+                        "per file.")
+    parser.add_argument("--python-loc", choices=["scc", "tokenize"],
+                        default="scc",
+                        help="count the lines of Python files with scc "
+                        "(default) or with the tokenize module, without "
+                        "running any subprocess.")
+    parser.add_argument("--cache", type=Path, default=None, metavar="PATH",
+                        help="SQLite database caching the results of each "
+                        "file by the hash of its content, so re-runs only "
+                        "analyze new or modified files (e.g. "
+                        "complexity_cache.sqlite). Disabled by default.")
+    parser.add_argument("--resume", action="store_true",
+                        help="resume an interrupted run, skipping the "
+                        "repositories (or chunks of notebooks, in the Kaggle "
+                        "split) already saved in the checkpoints of each "
+                        "split (research_questions/src/complexity/"
+                        "checkpoints).")
+    parser.add_argument("--output-format", choices=OUTPUT_FORMATS,
+                        default="csv",
+                        help="format of the files with the results of each "
+                        "split (default: csv). parquet requires pyarrow.")
+    parser.add_argument("--include-suffixes", nargs="*",
+                        default=list(INCLUDED_SUFFIXES), metavar="SUFFIX",
+                        help="only files with these suffixes are analyzed "
+                        "(default: .py .ipynb). Pass the option without "
+                        "suffixes to analyze all the files.")
+    parser.add_argument("--exclude-suffixes", nargs="*",
+                        default=list(EXCLUDED_SUFFIXES), metavar="SUFFIX",
+                        help="files with these suffixes are never analyzed.")
+    parser.add_argument("--max-file-size", type=int, default=None,
+                        metavar="BYTES",
+                        help="files bigger than BYTES are not analyzed "
+                        "(default: no limit).")
+    parser.add_argument("--manifest", type=Path, default=None, metavar="PATH",
+                        help="query the files of the splits from this "
+                        "manifest (see research_questions/src/utils/"
+                        "manifest.py) instead of walking the repositories. "
+                        "Splits not indexed in it are walked.")
+    parser.add_argument("--file-timeout", type=float, default=None,
+                        metavar="SECONDS",
+                        help="seconds the analysis of a single file can take "
+                        "before it is interrupted and recorded with the "
+                        "timeout_exceeded error (default: no limit). The "
+                        "files are then analyzed in a separate worker "
+                        "process, which adds a round trip through a pipe "
+                        "per file.")
+    parser.add_argument("--max-memory", type=int, default=None, metavar="MB",
+                        help="megabytes of memory the analysis of the files "
+                        "can use. Files exceeding it are recorded with the "
+                        "memory_limit_exceeded error (default: no limit).")
+    parser.add_argument("--profile", action="store_true",
+                        help="measure the time spent copying files, running "
+                        "scc, reading files, parsing notebooks, running "
+                        "lizard and the ast metrics, saving the profile of "
+                        "each split in research_questions/src/complexity/"
+                        "profiles.")
+    parser.add_argument("--kaggle-chunk-size", type=int, default=100,
+                        help="number of notebooks of the Kaggle dataset "
+                        "analyzed together by a worker (default: 100).")
+
+    return parser.parse_args()
 
 if __name__ == "__main__":
 
+    args = parse_args()
+    analysis_options = {
+        "included_suffixes": tuple(args.include_suffixes) or None,
+        "excluded_suffixes": tuple(suffix.lower() for suffix in args.exclude_suffixes),
+        "max_file_size": args.max_file_size,
+        "manifest_path": args.manifest,
+        "file_timeout": args.file_timeout or None,
+        "max_memory": args.max_memory * 1024 * 1024 if args.max_memory else None,
+        "profile": args.profile,
+    }
+
     # getting SE purpose repos path from configs.json:
     complete_directory_path = config.path_active_SE_py_repos
 
@@ -190,9 +851,15 @@ if __name__ == "__main__":
     print("Full Directory Path:", full_directory_path)
    
     all_complexity_results = get_complexity_metrics(full_directory_path, 
-        Path(Path.cwd(), "temp_copy_SE_py"), split="SE_py")
+        Path(Path.cwd(), "temp_copy_SE_py"), split="SE_py",
+        workers=args.workers, in_place=args.in_place,
+        scc_batch_size=args.scc_batch_size, python_loc=args.python_loc,
+        cache_path=args.cache, **analysis_options,
+        checkpoint_path=get_checkpoint_path("SE_py"),
+        resume=args.resume)
     
-    create_csv_complexity(all_complexity_results, "SE_py")
+    create_csv_complexity(all_complexity_results, "SE_py",
+                          args.output_format)
 
     print(f"Finished processing the SE_py repos!")
     
@@ -205,9 +872,15 @@ if __name__ == "__main__":
     print("Full Directory Path:", full_directory_path)
     
     all_complexity_results = get_complexity_metrics(
-        full_directory_path, Path(Path.cwd(), "temp_copy_non_SE_py"), split="Educational_py")
+        full_directory_path, Path(Path.cwd(), "temp_copy_non_SE_py"), split="Educational_py",
+        workers=args.workers, in_place=args.in_place,
+        scc_batch_size=args.scc_batch_size, python_loc=args.python_loc,
+        cache_path=args.cache, **analysis_options,
+        checkpoint_path=get_checkpoint_path("Educational_py"),
+        resume=args.resume)
     
-    create_csv_complexity(all_complexity_results, "Educational_py")
+    create_csv_complexity(all_complexity_results, "Educational_py",
+                          args.output_format)
 
     print(f"Finished processing the Educational_py repos!")
 
@@ -221,9 +894,15 @@ if __name__ == "__main__":
     print("Full Directory Path:", full_directory_path)
     
     all_complexity_results = get_complexity_metrics(
-        full_directory_path, Path(Path.cwd(), "temp_copy_non_SE"), split="Educational_nb")
+        full_directory_path, Path(Path.cwd(), "temp_copy_non_SE"), split="Educational_nb",
+        workers=args.workers, in_place=args.in_place,
+        scc_batch_size=args.scc_batch_size, python_loc=args.python_loc,
+        cache_path=args.cache, **analysis_options,
+        checkpoint_path=get_checkpoint_path("Educational_nb"),
+        resume=args.resume)
     
-    create_csv_complexity(all_complexity_results, "Educational_nb")
+    create_csv_complexity(all_complexity_results, "Educational_nb",
+                          args.output_format)
 
     print(f"Finished processing the Educational_nb repos!")
 
@@ -234,9 +913,15 @@ if __name__ == "__main__":
     print("Full Directory Path:", full_directory_path)
     
     all_complexity_results = get_complexity_metrics(
-        full_directory_path, Path(Path.cwd(), "temp_copy_SE"), split="SE_nb")
+        full_directory_path, Path(Path.cwd(), "temp_copy_SE"), split="SE_nb",
+        workers=args.workers, in_place=args.in_place,
+        scc_batch_size=args.scc_batch_size, python_loc=args.python_loc,
+        cache_path=args.cache, **analysis_options,
+        checkpoint_path=get_checkpoint_path("SE_nb"),
+        resume=args.resume)
     
-    create_csv_complexity(all_complexity_results, "SE_nb")
+    create_csv_complexity(all_complexity_results, "SE_nb",
+                          args.output_format)
 
     print(f"Finished processing the SE_nb repos!")
 
@@ -250,9 +935,14 @@ if __name__ == "__main__":
     print("Full Directory Path:", full_directory_path)
     
     all_complexity_results = get_complexity_metrics_kaggle(
-        full_directory_path, Path(Path.cwd(), "temp_copy_Kaggle"), split="Kaggle")
+        full_directory_path, Path(Path.cwd(), "temp_copy_Kaggle"), split="Kaggle",
+        in_place=args.in_place, python_loc=args.python_loc,
+        cache_path=args.cache, **analysis_options, workers=args.workers,
+        chunk_size=args.kaggle_chunk_size,
+        checkpoint_path=get_checkpoint_path("Kaggle"), resume=args.resume)
     
-    create_csv_complexity(all_complexity_results, "Kaggle")
+    create_csv_complexity(all_complexity_results, "Kaggle",
+                          args.output_format)
 
     print(f"Finished processing the Kaggle dataset!")
 
@@ -1,7 +1,53 @@
 import nbformat
 
+from research_questions.src.utils.notebook_json import read_notebook_json
+
+
+class ParsedNotebook:
+    """Code and markdown cells of a notebook, extracted from a single parse
+    of the notebook file, so that all the metrics of a notebook can be
+    computed without reading it again."""
+
+    def __init__(self, notebook):
+
+        cells = []
+        # notebooks in the nbformat 3 keep their cells inside worksheets:
+        if "worksheets" in notebook:
+            for n in notebook["worksheets"]:
+                cells += n["cells"]
+        else:
+            cells = notebook["cells"]
+
+        self.code_cells = [get_cell_source(c) for c in cells
+                           if c["cell_type"] == "code"]
+        self.markdown_cells = [get_cell_source(c) for c in cells
+                               if c["cell_type"] == "markdown"]
+        # the code content of the notebook:
+        self.source_code = "\n".join(self.code_cells)
+
+
+def get_cell_source(cell):
+    if "source" in cell:
+        cell_source = "".join(cell["source"])
+    elif "input" in cell:
+        cell_source = "".join(cell["input"])
+    else:
+        assert 1 == 0
+
+    return cell_source
+
 
 def read_notebook(filepath):
+    """Reads the metadata and cells of a notebook, without its outputs,
+    decoding its JSON directly. nbformat is only used for the files that are
+    not a valid notebook JSON."""
+
+    try:
+        return read_notebook_json(filepath)
+    except Exception:
+        return read_notebook_nbformat(filepath)
+
+def read_notebook_nbformat(filepath):
     try:
         with open(filepath, "r") as f:
             notebook = nbformat.read(f, as_version=nbformat.NO_CONVERT)
@@ -9,33 +55,24 @@ def read_notebook(filepath):
     except Exception as e:
         print(f"e1: {e}")
 
-def get_code_and_comment_lines_notebook(filepath):
+def parse_notebook(filepath):
+    """Reads a notebook and extracts its cells"""
 
-    notebook = read_notebook(filepath)
+    return ParsedNotebook(read_notebook(filepath))
 
-    code_cells = []
-    if "worksheets" in notebook:
-        for n in notebook["worksheets"]:
-            code_cells += [c for c in n["cells"] if c["cell_type"] == "code"]
-    else:
-        code_cells = [c for c in notebook["cells"] if c["cell_type"] == "code"]
+def get_code_and_comment_lines_notebook(filepath, notebook=None):
+    """notebook: the ParsedNotebook of filepath, if it was already parsed"""
+
+    if notebook is None:
+        notebook = parse_notebook(filepath)
 
-    source_code = []
     code_line_count = 0
     comment_line_count = 0
 
-    for c in code_cells:
-        if "source" in c:
-            cell_source = "".join(c["source"])
-        elif "input" in c:
-            cell_source = "".join(c["input"])
-        else:
-            assert 1 == 0
-
-        source_code.append(cell_source)
+    for cell_source in notebook.code_cells:
         lines = cell_source.split('\n')
         #
-        
+
         # counting comment lines in this cell
         for line in lines:
             stripped_line = line.strip()
@@ -44,35 +81,22 @@ def get_code_and_comment_lines_notebook(filepath):
             else:
                 if stripped_line:
                     code_line_count += 1
-        
-    source_code = "\n".join(source_code)
+
+    source_code = notebook.source_code
 
     return source_code, code_line_count, comment_line_count
 
 
-def get_markdown_line_count(filepath):
+def get_markdown_line_count(filepath, notebook=None):
+    """notebook: the ParsedNotebook of filepath, if it was already parsed"""
 
-    notebook = read_notebook(filepath)
+    if notebook is None:
+        notebook = parse_notebook(filepath)
 
-    markdown_cells = []
-    if "worksheets" in notebook:
-        for n in notebook["worksheets"]:
-            markdown_cells += [c for c in n["cells"] if c["cell_type"] == "markdown"]
-    else:
-        markdown_cells = [c for c in notebook["cells"] if c["cell_type"] == "markdown"]
-
-    
     markdown_line_count = 0
 
-    for c in markdown_cells:
-        if "source" in c:
-            cell_source = "".join(c["source"])
-        elif "input" in c:
-            cell_source = "".join(c["input"])
-        else:
-            assert 1 == 0
-        
+    for cell_source in notebook.markdown_cells:
         lines = cell_source.split('\n')
         markdown_line_count += len(lines)  # Count lines in this cell
 
-    return markdown_line_count
\ No newline at end of file
+    return markdown_line_count
@@ -0,0 +1,114 @@
+"""Opt-in timers of the stages of the complexity analysis (copying files,
+running scc, reading files, counting lines, parsing notebooks, lizard and
+the ast metrics), to find out where the time of complexity.main goes. When
+profiling is not enabled, the timers do nothing.
+
+Each process accumulates the time and the number of calls of each stage,
+which are collected with the statistics of the analysis of each repository
+(see complexity.main), so the profile of a split sums the time spent by all
+the worker processes. With --profile, complexity.main prints the profile of
+each split and saves it in research_questions/src/complexity/profiles, as
+<split>_profile.json and <split>_profile.csv."""
+
+import json
+import time
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+
+import pandas as pd
+
+# stages timed in FileComplexity and complexity.main, in the order of the
+# reports (line_count is the count of python lines with --python-loc
+# tokenize):
+STAGES = ('copy', 'scc', 'read', 'line_count', 'notebook_parse', 'lizard',
+          'ast')
+
+# prefixes of the keys of the stages in the statistics Counter:
+TIME_PREFIX = "time:"
+CALLS_PREFIX = "calls:"
+
+_enabled = False
+_profile = Counter()
+
+
+def enable_profiling(enabled: bool = True):
+
+    global _enabled
+    _enabled = enabled
+
+
+def is_profiling() -> bool:
+    return _enabled
+
+
+@contextmanager
+def stage(name: str):
+    """Times the code inside the with block as part of the stage name"""
+
+    if not _enabled:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _profile[TIME_PREFIX + name] += time.perf_counter() - start
+        _profile[CALLS_PREFIX + name] += 1
+
+
+def collect_profile() -> Counter:
+    """Returns the time of the stages accumulated by this process since the
+    last collection"""
+
+    profile = Counter(_profile)
+    _profile.clear()
+
+    return profile
+
+
+def add_profile(profile: dict):
+    """Adds the profile collected by another process (e.g. the worker of
+    guarded_analysis) to the profile of this process"""
+
+    _profile.update(profile)
+
+
+def profile_report(stats: dict, split: str) -> list:
+    """Rows of the profile of a split, one per stage, from the statistics
+    Counter of the split"""
+
+    total_seconds = sum(stats.get(TIME_PREFIX + name, 0) for name in STAGES)
+    report = []
+    for name in STAGES:
+        seconds = stats.get(TIME_PREFIX + name, 0)
+        calls = stats.get(CALLS_PREFIX + name, 0)
+        report.append({
+            "split": split,
+            "stage": name,
+            "calls": calls,
+            "seconds": round(seconds, 4),
+            "mean_ms": round(seconds / calls * 1000, 4) if calls else None,
+            "share": round(seconds / total_seconds, 4) if total_seconds else None,
+        })
+
+    return report
+
+
+def save_profile(stats: dict, split: str, directory: Path = None):
+    """Prints the profile of a split and saves it as a json and a csv file"""
+
+    if directory is None:
+        directory = Path(Path.cwd(), "research_questions", "src",
+                         "complexity", "profiles")
+    directory.mkdir(parents=True, exist_ok=True)
+
+    report = profile_report(stats, split)
+    df_report = pd.DataFrame.from_records(report)
+    print(f"profile of split {split}:")
+    print(df_report.drop(columns="split").to_string(index=False))
+
+    with open(Path(directory, split + "_profile.json"), "w") as f:
+        json.dump(report, f, indent=4)
+    df_report.to_csv(Path(directory, split + "_profile.csv"), index=False)
@@ -0,0 +1,136 @@
+"""Persistent cache of the results of FileComplexity, stored in a SQLite
+database. The results are keyed by the hash of the content of the file, its
+suffix (which defines its file type), the options of the analysis and
+ANALYZER_VERSION, so re-running complexity.main only analyzes new or
+modified files. ANALYZER_VERSION must be increased whenever a change to
+FileComplexity changes its results.
+
+Besides being used by complexity.main (--cache), you can print statistics
+of the cache, or remove entries from it, with the commands:
+
+python -m research_questions.src.complexity.result_cache complexity_cache.sqlite --stats
+python -m research_questions.src.complexity.result_cache complexity_cache.sqlite --invalidate
+python -m research_questions.src.complexity.result_cache complexity_cache.sqlite --evict-older-than 30
+
+from inside the main directory of this project."""
+
+import argparse
+import json
+import os
+import sqlite3
+import time
+from pathlib import Path
+
+from research_questions.src.utils.manifest import hash_file
+
+ANALYZER_VERSION = "2"
+
+# one connection per process and database, since sqlite connections can not
+# be shared with the forked worker processes:
+_open_caches = {}
+
+
+class ResultCache:
+
+    def __init__(self, db_path):
+
+        self.db_path = str(db_path)
+        self.connection = sqlite3.connect(self.db_path, timeout=60)
+        # allows the parallel workers to read while another one writes:
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "key TEXT PRIMARY KEY, result TEXT NOT NULL, created REAL NOT NULL)")
+        self.connection.commit()
+
+    def get(self, key):
+        """Returns the cached results for the key, or None"""
+
+        row = self.connection.execute(
+            "SELECT result FROM results WHERE key = ?", (key,)).fetchone()
+
+        if row is None:
+            return None
+
+        return json.loads(row[0])
+
+    def put(self, key, result: dict):
+
+        self.connection.execute(
+            "INSERT OR REPLACE INTO results (key, result, created) VALUES (?, ?, ?)",
+            (key, json.dumps(result), time.time()))
+        self.connection.commit()
+
+    def invalidate(self) -> int:
+        """Removes all the cached results. Returns the number of removed
+        entries."""
+
+        removed = self.connection.execute("DELETE FROM results").rowcount
+        self.connection.commit()
+        self.connection.execute("VACUUM")
+
+        return removed
+
+    def evict(self, older_than_days: float) -> int:
+        """Removes the results cached more than older_than_days ago.
+        Returns the number of removed entries."""
+
+        limit = time.time() - older_than_days * 24 * 60 * 60
+        removed = self.connection.execute(
+            "DELETE FROM results WHERE created < ?", (limit,)).rowcount
+        self.connection.commit()
+        self.connection.execute("VACUUM")
+
+        return removed
+
+    def __len__(self):
+        return self.connection.execute(
+            "SELECT COUNT(*) FROM results").fetchone()[0]
+
+
+def open_result_cache(db_path):
+    """Returns the ResultCache of db_path opened by the current process"""
+
+    if db_path is None:
+        return None
+
+    key = (os.getpid(), str(db_path))
+    if key not in _open_caches:
+        _open_caches[key] = ResultCache(db_path)
+
+    return _open_caches[key]
+
+
+def cache_key(filepath, python_loc='scc', content_hash=None) -> str:
+    """Key of the results of a file: the hash of its content, its suffix,
+    the analysis options and ANALYZER_VERSION."""
+
+    if content_hash is None:
+        content_hash = hash_file(filepath)
+
+    suffix = Path(filepath).suffix.lower()
+
+    return f"{content_hash}:{suffix}:{python_loc}:{ANALYZER_VERSION}"
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(
+        description="Manages the cache of complexity results.")
+    parser.add_argument("db_path", type=Path, help="path of the cache database")
+    parser.add_argument("--stats", action="store_true",
+                        help="print the number of cached results")
+    parser.add_argument("--invalidate", action="store_true",
+                        help="remove all the cached results")
+    parser.add_argument("--evict-older-than", type=float, metavar="DAYS",
+                        help="remove the results cached more than DAYS ago")
+    args = parser.parse_args()
+
+    cache = ResultCache(args.db_path)
+
+    if args.invalidate:
+        print(f"{cache.invalidate()} cached results were removed")
+    if args.evict_older_than is not None:
+        print(f"{cache.evict(args.evict_older_than)} cached results were removed")
+    if args.stats or not (args.invalidate or args.evict_older_than is not None):
+        print(f"{len(cache)} cached results in {args.db_path}")
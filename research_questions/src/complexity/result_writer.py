@@ -0,0 +1,133 @@
+"""Writes the complexity results of a split in batches of rows, as a csv file
+(appending one chunk per batch) or as a Parquet file (one row group per
+batch), so the results never need to be held in a single DataFrame. The
+same writer saves the table with the metrics of each function. The
+Parquet format requires the pyarrow library.
+
+The columns have fixed types, so every batch is formatted the same way
+regardless of the missing values it has."""
+
+from pathlib import Path
+import pandas as pd
+
+# only these file types are saved in the results:
+OUTPUT_FILE_TYPES = ('python', 'notebook')
+
+# columns of the results, in the order of FileComplexity.to_dict, plus the
+# filepath, and their pandas types:
+COLUMN_TYPES = {
+    "file_type": "object",
+    "num_comment_lines": "Int64",
+    "markdown_lines_count": "Int64",
+    "loc": "Int64",
+    "num_functions": "Int64",
+    "functions": "object",
+    "average_cyclomatic_complexity": "float64",
+    "num_classes": "Int64",
+    "success_counting_classes": "bool",
+    "max_nesting_depth": "Int64",
+    "num_imports": "Int64",
+    "num_decision_points": "Int64",
+    "errors": "object",
+    "filepath": "object",
+}
+
+# columns of the table of functions (one row per function, see
+# FileComplexity.function_metrics), and their pandas types:
+FUNCTION_COLUMN_TYPES = {
+    "filepath": "object",
+    "function_name": "object",
+    "cyclomatic_complexity": "Int64",
+    "nloc": "Int64",
+    "token_count": "Int64",
+    "parameter_count": "Int64",
+}
+
+OUTPUT_FORMATS = ('csv', 'parquet')
+
+
+class ResultWriter:
+
+    def __init__(self, filepath, output_format='csv', batch_size=10000,
+                 column_types=None):
+        """filepath: the csv or parquet file to write.
+        batch_size: number of rows kept in memory before being written.
+        column_types: the columns of the rows and their pandas types
+        (COLUMN_TYPES by default)."""
+
+        assert output_format in OUTPUT_FORMATS, f"""Output format not
+            supported: {output_format}. Supported formats: 'csv' and
+            'parquet'."""
+
+        self.filepath = Path(filepath)
+        self.output_format = output_format
+        self.batch_size = batch_size
+        self.column_types = column_types or COLUMN_TYPES
+        self.rows = []
+        self.written_rows = 0
+        self.parquet_writer = None
+
+        if output_format == 'csv':
+            # the header is written even when there are no results:
+            pd.DataFrame(columns=list(self.column_types)).to_csv(
+                self.filepath, index=False)
+
+    def write(self, row: dict):
+
+        self.rows.append(row)
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Writes the rows kept in memory"""
+
+        if not self.rows:
+            return
+
+        df_batch = pd.DataFrame.from_records(self.rows,
+                                             columns=list(self.column_types))
+        df_batch = df_batch.astype(self.column_types)
+
+        if self.output_format == 'csv':
+            df_batch.to_csv(self.filepath, mode="a", header=False, index=False)
+        else:
+            self.write_parquet_row_group(df_batch)
+
+        self.written_rows += len(self.rows)
+        self.rows = []
+
+    def write_parquet_row_group(self, df_batch):
+
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if self.parquet_writer is None:
+            # the schema is fixed by the column types, since a batch can
+            # have only missing values in a column:
+            arrow_types = {"Int64": pa.int64(), "float64": pa.float64(),
+                           "bool": pa.bool_(), "object": pa.string()}
+            schema = pa.schema([
+                (column, pa.list_(pa.string()) if column == "functions"
+                 else arrow_types[column_type])
+                for column, column_type in self.column_types.items()])
+            self.parquet_writer = pq.ParquetWriter(self.filepath, schema)
+
+        table = pa.Table.from_pandas(df_batch, schema=self.parquet_writer.schema,
+                                     preserve_index=False)
+        self.parquet_writer.write_table(table)
+
+    def close(self):
+
+        self.flush()
+        if self.output_format == 'parquet':
+            if self.parquet_writer is None:
+                # writing a file with the columns, even without results:
+                self.write_parquet_row_group(pd.DataFrame(
+                    columns=list(self.column_types)).astype(self.column_types))
+            self.parquet_writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -1,34 +1,41 @@
 """ Script to count the number of Jupyter notebooks belonging to both SE and
 Non SE splits. This script assumes that you already have the cloned 
-repositories stored in the path you have configured in configs/configs.json."""
+repositories stored in the path you have configured in configs/configs.json.
+Use --manifest to count the notebooks from the manifest of the cloned
+repositories (see research_questions/src/utils/manifest.py) instead of
+walking them."""
 
+import argparse
 from research_questions.configs.configs import Configs
+from research_questions.src.utils.manifest import list_files
 from pathlib import Path
 
 config = Configs()
 
 
-def count_total_notebooks(path: Path) -> int:
+def count_total_notebooks(path: Path, manifest_path=None) -> int:
 
     # getting the files that are only jupyter notebooks:
-    notebook_paths = list(path.glob('**/*.ipynb'))
-    total_notebooks = len(notebook_paths)
+    total_notebooks = len(list_files(path, manifest_path,
+                                     included_suffixes=['.ipynb']))
 
     return total_notebooks
 
 
-def count_notebooks_in_split():
+def count_notebooks_in_split(manifest_path=None):
 
     complete_directory_path = config.path_active_SE_repos
     path_SE_notebooks = Path(complete_directory_path)
 
-    total_notebooks_SE = count_total_notebooks(path_SE_notebooks)
+    total_notebooks_SE = count_total_notebooks(path_SE_notebooks,
+                                               manifest_path)
     print(f"Number of notebooks in the SE purpose split: {total_notebooks_SE}")
 
     complete_directory_path = config.path_active_non_SE_repos
     path_non_SE_notebooks = Path(complete_directory_path)
 
-    total_notebooks_non_SE = count_total_notebooks(path_non_SE_notebooks)
+    total_notebooks_non_SE = count_total_notebooks(path_non_SE_notebooks,
+                                                   manifest_path)
     print(
         f"Number of notebooks in the Non SE purpose split: {total_notebooks_non_SE}")
 
@@ -47,4 +54,11 @@ def count_notebooks_in_split():
 
 if __name__ == "__main__":
 
-    count_notebooks_in_split()
+    parser = argparse.ArgumentParser(
+        description="Counts the notebooks of the SE and Non SE splits.")
+    parser.add_argument("--manifest", type=Path, default=None, metavar="PATH",
+                        help="count the notebooks from this manifest instead "
+                        "of walking the repositories.")
+    args = parser.parse_args()
+
+    count_notebooks_in_split(args.manifest)
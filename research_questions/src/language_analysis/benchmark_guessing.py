@@ -0,0 +1,123 @@
+"""Benchmark of the throughput of guessing the language of the notebooks
+without language metadata, the only ones language_only_nbs guesses with
+guesslang.
+
+The notebooks of a directory whose metadata has no language (see
+get_language_info_or_code in language_only_nbs) are collected first, and
+their language is then guessed:
+
+- per_notebook_model: creating a new guesslang.Guess (and loading its model)
+  for each notebook, as language_only_nbs did before the guesser was shared.
+- shared_model: with the shared guesser, one notebook at a time.
+- batched: with the shared guesser, classifying batch_size notebooks with
+  each call of the model (see guessing.guess_language_names).
+
+The time of loading the shared model is reported apart. You can run this
+script with the command:
+
+python -m research_questions.src.language_analysis.benchmark_guessing <directory>
+
+from inside the main directory of this project, in the environment of
+requirements.txt. Use --limit to guess only some of the notebooks, and
+--skip-per-notebook-model to skip the slowest strategy."""
+
+import argparse
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from research_questions.src.utils.walker import walk_files
+from .guessing import GUESS_BATCH_SIZE, get_guesser, guess_language_names
+from .language_only_nbs import get_language_info_or_code
+
+
+def collect_notebooks_to_guess(directory: Path, limit: int = None) -> list:
+    """Source codes of the notebooks of directory without language
+    metadata, skipping the ones without code"""
+
+    source_codes = []
+    for entry in walk_files(directory, included_suffixes=['.ipynb']):
+        lang_info, source_code = get_language_info_or_code(Path(entry.path))
+        if lang_info is None and source_code:
+            source_codes.append(source_code)
+            if limit is not None and len(source_codes) >= limit:
+                break
+
+    return source_codes
+
+
+def guess_per_notebook_model(source_codes: list) -> list:
+
+    from guesslang import Guess
+
+    return [Guess().language_name(source_code) for source_code in source_codes]
+
+
+def guess_shared_model(source_codes: list) -> list:
+
+    guesser = get_guesser()
+
+    return [guesser.language_name(source_code) for source_code in source_codes]
+
+
+def run_benchmark(source_codes: list, batch_size: int = GUESS_BATCH_SIZE,
+                  per_notebook_model: bool = True) -> pd.DataFrame:
+
+    rows = []
+
+    start = time.perf_counter()
+    get_guesser()
+    rows.append({"strategy": "load_shared_model", "notebooks": 0,
+                 "seconds": round(time.perf_counter() - start, 4),
+                 "notebooks_per_second": None, "same_as_shared_model": None})
+
+    strategies = {"shared_model": guess_shared_model,
+                  "batched": lambda codes: guess_language_names(codes, batch_size)}
+    if per_notebook_model:
+        strategies["per_notebook_model"] = guess_per_notebook_model
+
+    reference_names = None
+    for strategy, function in strategies.items():
+        start = time.perf_counter()
+        lang_names = function(source_codes)
+        seconds = time.perf_counter() - start
+
+        if reference_names is None:
+            reference_names = lang_names
+        rows.append({"strategy": strategy, "notebooks": len(source_codes),
+                     "seconds": round(seconds, 4),
+                     "notebooks_per_second": round(len(source_codes) / seconds, 2)
+                     if seconds else None,
+                     # the guesses must not change with the strategy:
+                     "same_as_shared_model": lang_names == reference_names})
+        print(f"{strategy}: {rows[-1]['notebooks_per_second']} notebooks/s")
+
+    return pd.DataFrame.from_records(rows)
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(
+        description="Benchmarks guessing the language of the notebooks without language metadata.")
+    parser.add_argument("directory", type=Path,
+                        help="directory with the notebooks (e.g. the cloned repositories)")
+    parser.add_argument("--limit", type=int, default=None,
+                        help="maximum number of notebooks to guess")
+    parser.add_argument("--batch-size", type=int, default=GUESS_BATCH_SIZE,
+                        help=f"notebooks per call of the model (default: {GUESS_BATCH_SIZE})")
+    parser.add_argument("--skip-per-notebook-model", action="store_true",
+                        help="do not benchmark loading the model for each notebook")
+    parser.add_argument("--output", type=Path, default=None,
+                        help="csv file to save the results to")
+    args = parser.parse_args()
+
+    source_codes = collect_notebooks_to_guess(args.directory, args.limit)
+    print(f"{len(source_codes)} notebooks without language metadata in {args.directory}")
+
+    df_results = run_benchmark(source_codes, args.batch_size,
+                               not args.skip_per_notebook_model)
+
+    print(df_results.to_string(index=False))
+    if args.output is not None:
+        df_results.to_csv(args.output, index=False)
@@ -0,0 +1,118 @@
+"""Guesses the language of source code with the guesslang library
+(https://github.com/yoeo/guesslang). Creating a guesslang.Guess loads its
+TensorFlow model, which takes much longer than guessing the language of a
+notebook, so a single guesser is created per process, the first time it is
+needed (get_guesser), and reused for all the notebooks.
+
+guess_language_names classifies the code of many notebooks with a single
+call of the model per batch, instead of one call per notebook, applying the
+same rules as Guess.language_name to each of them. This relies on private
+attributes of Guess (its model, extension map and reliability check), so
+guesslang is pinned in the requirements.txt of this directory. If they
+change, the notebooks are guessed one by one, much more slowly, and a message
+is printed once per process."""
+
+import os
+from operator import itemgetter
+from typing import List, Optional
+
+from research_questions.src.utils.scc import batched
+
+# number of source codes classified by each call of the model:
+GUESS_BATCH_SIZE = 64
+
+# one guesser per process, since the parallel workers each need their own:
+_guessers = {}
+
+# whether the fallback to guessing one by one was already reported:
+_warned_fallback = False
+
+
+def get_guesser():
+    """Returns the guesslang.Guess of the current process, creating it (and
+    loading its model) the first time"""
+
+    key = os.getpid()
+    if key not in _guessers:
+        # imported here, since importing guesslang loads TensorFlow:
+        from guesslang import Guess
+        _guessers[key] = Guess()
+
+    return _guessers[key]
+
+
+def guess_language_names(source_codes: List[str],
+                         batch_size: int = GUESS_BATCH_SIZE) -> List[Optional[str]]:
+    """Guesses the language of many source codes, as Guess.language_name.
+    Args:
+        source_codes: the source codes to guess the language of
+        batch_size: number of source codes classified by each call of the
+        model
+    Returns:
+        language_names: the name of the language of each source code, or
+        None when the source code is empty or the guess is not reliable.
+    """
+
+    global _warned_fallback
+
+    language_names = [None] * len(source_codes)
+    # empty source codes are not classified, as in Guess.language_name:
+    positions = [position for position, source_code in enumerate(source_codes)
+                 if source_code.strip()]
+    if not positions:
+        # without loading the model:
+        return language_names
+
+    guesser = get_guesser()
+
+    for batch in batched(positions, batch_size):
+        try:
+            batch_names = guess_batch(guesser,
+                                      [source_codes[position] for position in batch])
+        except Exception as e:
+            # e.g. a guesslang version with a different model interface:
+            if not _warned_fallback:
+                print(f"e1: batched guessing failed, guessing one by one, "
+                      f"which is much slower: {e}")
+                _warned_fallback = True
+            batch_names = [guess_one(guesser, source_codes[position])
+                           for position in batch]
+
+        for position, language_name in zip(batch, batch_names):
+            language_names[position] = language_name
+
+    return language_names
+
+
+def guess_batch(guesser, source_codes: List[str]) -> List[Optional[str]]:
+    """Classifies a batch of source codes with a single call of the model of
+    the guesser"""
+
+    import tensorflow as tf
+
+    predicted = guesser._model.signatures['serving_default'](
+        tf.constant(source_codes))
+    all_scores = predicted['scores'].numpy()
+    all_extensions = predicted['classes'].numpy()
+
+    language_names = []
+    for scores, extensions in zip(all_scores, all_extensions):
+        probabilities = sorted(
+            ((guesser._extension_map[extension.decode()], score)
+             for extension, score in zip(extensions, scores.tolist())),
+            key=itemgetter(1), reverse=True)
+
+        if guesser._is_reliable([score for _, score in probabilities]):
+            language_names.append(probabilities[0][0])
+        else:
+            language_names.append(None)
+
+    return language_names
+
+
+def guess_one(guesser, source_code: str) -> Optional[str]:
+
+    try:
+        return guesser.language_name(source_code)
+    except Exception:
+        return None
@@ -12,8 +12,13 @@ in the end of the execution of this script. Thus, you can use thsi script
 to run loc in data you keeo in an external hard disk, as an example.
 
 This script can take hours to run. The scc lib was installed with snap, for 
-Ubuntu."""
+Ubuntu.
+If your repositories are readable by scc (e.g. they are inside your home
+directory), run the script with --in-place to skip the copies: files are
+then only copied when scc fails to read them, and the number of copied files
+is printed for each split."""
 
+import argparse
 import json
 import sys
 import signal
@@ -25,6 +30,8 @@ import pandas as pd
 from typing import List
 
 from research_questions.configs.configs import Configs
+from research_questions.src.utils.scc import batched, run_scc_batch, to_language_summary
+from research_questions.src.utils.manifest import list_files
 
 config = Configs()
 
@@ -51,7 +58,9 @@ def run_scc_single_file(path: Path):
         return None
 
 
-def copy_repository_to_run_loc(source_dir, destination_dir, split):
+def copy_repository_to_run_loc(source_dir, destination_dir, split,
+                               in_place=False, scc_batch_size=1,
+                               manifest_path=None):
     """Function that copies the files to your current working directory 
     (directory of this project), and uses the scc lib to run
     loc (and also infer the file language). Since scc lib installed with snap 
@@ -61,6 +70,13 @@ def copy_repository_to_run_loc(source_dir, destination_dir, split):
         destination_dir: the directory to copy the desired files to. The files
         are copied one by one, and the loc is always executed in a single file
         at a time.
+        split: name of the split, only used to print the progress.
+        in_place: when True, loc runs directly on the files of source_dir,
+        and a file is only copied to destination_dir when scc fails to read it.
+        scc_batch_size: number of files of a repository passed to a single
+        scc invocation. With 1, scc runs once per file.
+        manifest_path: path of the Manifest database the files of the
+        repositories are queried from, instead of walking them.
         Returns:
         all_loc_results: a list with the resulting json for a given file in
         which loc operation was performed
@@ -73,25 +89,37 @@ def copy_repository_to_run_loc(source_dir, destination_dir, split):
     os.makedirs(destination_path)
     # counting the processed repositories only to print them in the terminal:
     processed_repo_count = 0
+    # counting the files that had to be copied in the in place mode:
+    staged_file_count = 0
 
     # iterating through all the repositories:
     for repository_dir in source_dir.iterdir():
         # running loc (infers language) on a given file:
-        files_to_run_loc = filter_desired_files(repository_dir)
+        files_to_run_loc = filter_desired_files(repository_dir, manifest_path)
+
+        batch_results = {}
+        if scc_batch_size > 1:
+            for batch in batched(files_to_run_loc, scc_batch_size):
+                batch_results.update(run_scc_batch_files(batch,
+                                                         destination_path,
+                                                         in_place))
 
         for current_file in files_to_run_loc:
 
-            # copy2 ensures the metada of the copied file is kept:
-            copied_file = shutil.copy2(current_file, destination_path)
-            # getting loc/language results for the given file:
-            loc_results = run_scc_single_file(copied_file)
+            if current_file in batch_results:
+                loc_results = batch_results[current_file]
+            else:
+                loc_results, staged = run_loc_single_file(current_file,
+                                                          destination_path,
+                                                          in_place)
+                staged_file_count += staged
 
             if loc_results:
 
                 loc_results = loc_results[0]
                 # only formatting information to save in csv file:
                 # formatting the current filename:
-                loc_results['filename'] = str(copied_file).split('/')[-1]
+                loc_results['filename'] = current_file.name
                 # formatting the name of the repository that contains
                 # the analyzed file:
                 loc_results['repository'] = str(
@@ -99,19 +127,84 @@ def copy_repository_to_run_loc(source_dir, destination_dir, split):
                 del loc_results['Files']
 
                 all_loc_results.append(loc_results)
-            # deleting the copied file, to prevent using too much memory:
-            os.remove(copied_file)
 
         processed_repo_count += 1
         if processed_repo_count % 1 == 0:
             print(f"{processed_repo_count} were processed in split {str(split)}")
 
+    if in_place:
+        print(f"{staged_file_count} files needed to be copied to be read by scc in split {str(split)}")
+
     # excluding the temporary directory
     shutil.rmtree(destination_dir)
 
     return all_loc_results
 
 
+def run_loc_single_file(current_file: Path, destination_path: Path,
+                        in_place=False):
+    """Runs loc in a single file. By default, the file is copied to
+    destination_path before running loc. In the in place mode, loc runs in
+    the file where it is stored, and the copy is only done when scc fails
+    to read it. Returns the scc results and whether a copy was needed in
+    the in place mode."""
+
+    loc_results = None
+    staged = False
+    if in_place:
+        loc_results = run_scc_single_file(current_file)
+        staged = not loc_results
+
+    if not in_place or staged:
+        # copy2 ensures the metada of the copied file is kept:
+        copied_file = shutil.copy2(current_file, destination_path)
+        # getting loc/language results for the given file:
+        loc_results = run_scc_single_file(copied_file)
+        # deleting the copied file, to prevent using too much memory:
+        os.remove(copied_file)
+
+    return loc_results, staged
+
+
+def run_scc_batch_files(batch: List[Path], destination_path: Path,
+                        in_place=False) -> dict:
+    """Runs loc in a batch of files with a single scc invocation. Without
+    the in place mode, each file is copied to destination_path, inside a
+    subdirectory named after its position in the batch, since files of the
+    same repository can share the same name.
+    Returns a dict mapping the files scc reported to their results, in the
+    same format returned by run_scc_single_file. Files scc did not report
+    are left to be run one by one."""
+
+    if in_place:
+        scc_paths = [str(current_file) for current_file in batch]
+    else:
+        scc_paths = []
+        for position, current_file in enumerate(batch):
+            copy_dir = Path(destination_path, str(position))
+            copy_dir.mkdir(exist_ok=True)
+            # copy2 ensures the metada of the copied file is kept:
+            scc_paths.append(shutil.copy2(current_file, copy_dir))
+
+    try:
+        scc_results = run_scc_batch(scc_paths, timeout=15 * len(batch))
+    except Exception as e:
+        print(e)
+        scc_results = {}
+
+    batch_results = {}
+    for current_file, scc_path in zip(batch, scc_paths):
+        if scc_path in scc_results:
+            batch_results[current_file] = [
+                to_language_summary(scc_results[scc_path])]
+
+        if not in_place:
+            # deleting the copied file, to prevent using too much memory:
+            shutil.rmtree(Path(scc_path).parent)
+
+    return batch_results
+
+
 def create_csv_loc_results(all_loc_resuts: List[dict], split: str):
     """Save the results of the loc operation ran over all the
     repositories, according to the script they belong, in a csv
@@ -138,30 +231,44 @@ def signal_handler(sig, frame):
 signal.signal(signal.SIGINT, signal_handler)
 
 
-def filter_desired_files(repository: Path) -> list:
+def filter_desired_files(repository: Path, manifest_path=None) -> list:
     """Returns files for detecting language, while ignoring .gitignore,
      files inside .git/ directory,and other fyle types, since makes no sense 
      to analyze the language of these files.
     Filters the desired files to run loc from each repository path, passed as
-    parameter to this function."""
-
-    desired_files = []
-    for filepath in repository.rglob('*'):
-        # ignoring files inside .git folders, and also ignoring .gitignore files:
-        try:
-            if filepath.is_file():
-                # ignroing unnecessary files:
-                if filepath.is_file() and '.git' not in filepath.parts and not filepath.suffix.lower() in ['.gitignore', '.png', '.jpg', '.jpeg', '.svg']:
-                    desired_files.append(filepath)
-        except Exception as e:
-            print(e)
-            continue
-
-    return desired_files
+    parameter to this function. The files are queried from the manifest
+    when the repository is indexed in it."""
+
+    # ignoring files inside .git folders, and also ignoring .gitignore files
+    # and other unnecessary files:
+    return list_files(
+        repository, manifest_path,
+        excluded_suffixes=['.gitignore', '.png', '.jpg', '.jpeg', '.svg'])
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Gathers language info of all the active repositories.")
+    parser.add_argument("--in-place", action="store_true",
+                        help="run loc directly on the cloned repositories, "
+                        "copying only the files scc cannot read to the "
+                        "temporary folders.")
+    parser.add_argument("--scc-batch-size", type=int, default=100,
+                        help="number of files passed to a single scc "
+                        "invocation (default: 100). Use 1 to run scc once "
+                        "per file.")
+    parser.add_argument("--manifest", type=Path, default=None, metavar="PATH",
+                        help="query the files of the repositories from this "
+                        "manifest (see research_questions/src/utils/"
+                        "manifest.py) instead of walking them.")
+
+    return parser.parse_args()
 
 
 if __name__ == "__main__":
 
+    args = parse_args()
+
     # getting SE purpose repos path from configs.json:
     complete_directory_path = config.path_active_SE_repos
 
@@ -169,7 +276,9 @@ if __name__ == "__main__":
     print("Full Directory Path:", full_directory_path)
 
     all_loc_results = copy_repository_to_run_loc(
-        full_directory_path, Path(Path.cwd(), "temp_copy_SE"), split="SE")
+        full_directory_path, Path(Path.cwd(), "temp_copy_SE"), split="SE",
+        in_place=args.in_place, scc_batch_size=args.scc_batch_size,
+        manifest_path=args.manifest)
 
     print(f"Finished processing the SE repos!")
 
@@ -183,7 +292,9 @@ if __name__ == "__main__":
     print("Full Directory Path:", full_directory_path)
 
     all_loc_results = copy_repository_to_run_loc(
-        full_directory_path, Path(Path.cwd(), "temp_copy_non_SE"), split="non_SE")
+        full_directory_path, Path(Path.cwd(), "temp_copy_non_SE"), split="non_SE",
+        in_place=args.in_place, scc_batch_size=args.scc_batch_size,
+        manifest_path=args.manifest)
 
     create_csv_loc_results(all_loc_results, "language_all_non_SE_repos")
 
@@ -4,17 +4,44 @@ library.
 To run this script, activate the environment where you have installed
 the dependencies of requirements_lang_info.txt
 
-This script runs fast, in some minutes."""
+This script runs fast, in some minutes. Use --manifest to query the
+notebooks from the manifest of the cloned repositories (see
+research_questions/src/utils/manifest.py) instead of walking them.
+Notebooks bigger than 10 MB are streamed, discarding their outputs without
+loading them in memory, when the ijson library is installed (see
+research_questions/src/utils/notebook_json.py). The guesslang model is loaded
+once, and the notebooks without language metadata are guessed in batches
+(see guessing.py). Use --workers to process the notebooks in parallel, each
+worker process with its own guesslang model.
+
+Only the metadata of the notebooks is read when it has their language, and
+the notebooks are fully read and validated with nbformat only when their
+language must be guessed.
+
+The results are written as JSON Lines files (one notebook per line) as the
+notebooks are processed, which parse_data_from_json.py reads."""
+import argparse
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 import nbformat
 import time
 import json
-from guesslang import Guess
 
 from research_questions.configs.configs import Configs
+from research_questions.src.utils.manifest import list_files
+from research_questions.src.utils.notebook_json import (read_notebook_metadata,
+                                                       read_notebook_node)
+from research_questions.src.utils.scc import batched
+from .guessing import GUESS_BATCH_SIZE, guess_language_names
 
 config = Configs()
 
+# number of notebooks of each shard processed by a worker, with --workers:
+SHARD_SIZE = 200
+
+# number of notebooks written to the JSON Lines files between flushes:
+FLUSH_EVERY = 100
+
 
 def get_code_lines(notebook: Path) -> str:
     """Extracts the content of only the code cells of a notebook"""
@@ -35,7 +62,7 @@ def get_language_info(ipynb_path: Path) -> dict:
 
     lang_info = None
     try:
-        notebook = nbformat.read(ipynb_path, as_version=nbformat.NO_CONVERT)
+        notebook = read_notebook_node(ipynb_path)
 
     except:
         print(f"[{time.time()}] Error parsing notebook at: {str(ipynb_path)}")
@@ -51,9 +78,29 @@ def get_and_guess_language_info(ipynb_path: Path) -> dict:
     """Gathers the language info from the metadata of the notebook,
     when available, or try to guess its language"""
 
+    lang_info, source_code = get_language_info_or_code(ipynb_path)
+    if lang_info is not None:
+        return lang_info
+
+    return guess_language_info([source_code])[0]
+
+
+def get_language_info_or_code(ipynb_path: Path):
+    """Gathers the language info from the metadata of the notebook. When it
+    is not available, returns the code of the notebook instead, to guess its
+    language from (see guess_language_info).
+    Returns:
+        lang_info: the language info, or None when it must be guessed
+        source_code: the code of the notebook when lang_info is None
+    """
+
+    lang_info = get_language_info_from_metadata(ipynb_path)
+    if lang_info is not None:
+        return lang_info, None
+
     notebook = None
     try:
-        notebook = nbformat.read(ipynb_path, as_version=nbformat.NO_CONVERT)
+        notebook = read_notebook_node(ipynb_path)
 
         num_changes, notebook = nbformat.validator.normalize(
             notebook, relax_add_props=True, strip_invalid_metadata=True)
@@ -63,7 +110,7 @@ def get_and_guess_language_info(ipynb_path: Path) -> dict:
     except Exception as e:
         print(f"[{time.time()}] Error parsing notebook at: {str(ipynb_path)}")
 
-        return {"name": "unknown", "version": "unknown", "reason": "parse_fail"}
+        return {"name": "unknown", "version": "unknown", "reason": "parse_fail"}, None
 
     try:
 
@@ -71,33 +118,83 @@ def get_and_guess_language_info(ipynb_path: Path) -> dict:
             assert len(notebook["metadata"]["language_info"]["name"]) > 0
             lang_info = notebook["metadata"]["language_info"]
             lang_info["reason"] = "metadata_language_info"
-            return lang_info
+            return lang_info, None
         else:
             assert len(notebook["metadata"]["kernelspec"]["name"]) > 0
             lang_info = notebook["metadata"]["kernelspec"]
             lang_info["reason"] = "metadata_kernelspec"
-            return lang_info
+            return lang_info, None
     except:
         try:
-            guesser = Guess()
-            source_code = get_code_lines(notebook)
-            lang_name = None
+            return None, get_code_lines(notebook)
+        except:
+            return {"name": "unknown", "version": "unknown", "reason": "guess_fail"}, None
 
-            if source_code:
-                lang_name = guesser.language_name(source_code)
 
-                assert lang_name != None
-                if lang_name == 'Python' or 'python':
+def get_language_info_from_metadata(ipynb_path: Path):
+    """Fast path of get_language_info_or_code: reads only the metadata of
+    the notebook, without parsing and validating the whole notebook.
+    Returns the language info as get_language_info_or_code, or None when
+    the metadata has no valid language_info or kernelspec (or the file can
+    not be read), so the notebook must be fully read."""
 
-                    return {"name": lang_name, "version": "unknown", "reason": "guess"}
-                else:
-                    return {"name": 'Others', "version": "unknown", "reason": "guess", "guessed_name": lang_name}
-            else:
-                return {"name": "markdown", "version": "unknown", "reason": "no_code"}
-        except:
-            return {"name": "unknown", "version": "unknown", "reason": "guess_fail"}
+    try:
+        metadata = read_notebook_metadata(ipynb_path)
+    except Exception:
+        return None
+
+    if not isinstance(metadata, dict):
+        return None
+
+    # the same language info nbformat.validate accepts:
+    if "language_info" in metadata:
+        lang_info = metadata["language_info"]
+        if (isinstance(lang_info, dict) and isinstance(lang_info.get("name"), str)
+                and len(lang_info["name"]) > 0):
+            lang_info["reason"] = "metadata_language_info"
+            return lang_info
+        return None
+
+    lang_info = metadata.get("kernelspec")
+    if (isinstance(lang_info, dict) and isinstance(lang_info.get("name"), str)
+            and len(lang_info["name"]) > 0
+            and isinstance(lang_info.get("display_name"), str)):
+        lang_info["reason"] = "metadata_kernelspec"
+        return lang_info
+
+    return None
+
+
+def guess_language_info(source_codes: list) -> list:
+    """Guesses the language info of the code of many notebooks, classifying
+    all of them with the shared guesser (see guessing.py)"""
+
+    codes_to_guess = [source_code for source_code in source_codes if source_code]
+    try:
+        lang_names = iter(guess_language_names(codes_to_guess))
+    except Exception as e:
+        print(f"[{time.time()}] Error guessing the language of notebooks: {e}")
+        lang_names = iter([None] * len(codes_to_guess))
+
+    all_lang_info = []
+    for source_code in source_codes:
+        if not source_code:
+            all_lang_info.append(
+                {"name": "markdown", "version": "unknown", "reason": "no_code"})
+            continue
+
+        lang_name = next(lang_names)
+        if lang_name is None:
+            all_lang_info.append(
+                {"name": "unknown", "version": "unknown", "reason": "guess_fail"})
+        elif lang_name == 'Python' or 'python':
+            all_lang_info.append(
+                {"name": lang_name, "version": "unknown", "reason": "guess"})
+        else:
+            all_lang_info.append(
+                {"name": 'Others', "version": "unknown", "reason": "guess", "guessed_name": lang_name})
 
-    return {"name": "unknown", "version": "unknown", "reason": "unknown"}
+    return all_lang_info
 
 
 def format_github_repo_url(notebook_path: Path) -> str:
@@ -119,58 +216,168 @@ def format_github_notebook_url(notebook_path: Path) -> str:
     return notebook_url
 
 
-def generate_lang_info_from_local_nbs(path: Path) -> dict:
+def generate_lang_info_from_local_nbs(path: Path,
+                                      guess_batch_size: int = GUESS_BATCH_SIZE,
+                                      workers: int = 1,
+                                      shard_size: int = SHARD_SIZE,
+                                      print_progress: bool = True) -> dict:
+    """Gathers the language info of the notebooks of path (a list of
+    notebooks), mapping the url of each notebook to its language info (see
+    iter_lang_info_from_local_nbs)."""
+
+    return dict(iter_lang_info_from_local_nbs(path, guess_batch_size, workers,
+                                              shard_size, print_progress))
+
+
+def iter_lang_info_from_local_nbs(path: Path,
+                                  guess_batch_size: int = GUESS_BATCH_SIZE,
+                                  workers: int = 1,
+                                  shard_size: int = SHARD_SIZE,
+                                  print_progress: bool = True):
+    """Yields the url and the language info of each notebook of path (a
+    list of notebooks), in the order of the notebooks, as they are
+    processed. With more than 1 worker, the notebooks are split in shards
+    of shard_size notebooks, processed by a pool of worker processes, and
+    the results are yielded in the order of the notebooks, as when
+    processed serially."""
+
+    if workers > 1:
+        yield from iter_lang_info_in_parallel(path, guess_batch_size, workers,
+                                              shard_size)
+        return
 
     total_notebooks = len(path)
     processed_count = 0
 
-    all_notebooks_lang_info = {}
+    # notebooks not yielded yet, as (notebook url, repo url, lang_info,
+    # source code), since the ones before them are waiting to be guessed:
+    pending_notebooks = []
+    num_notebooks_to_guess = 0
 
     for notebook_path in path:
 
-        lang_info = get_and_guess_language_info(notebook_path)
+        lang_info, source_code = get_language_info_or_code(notebook_path)
 
         formatted_repo_url = str(format_github_repo_url(notebook_path))
-        lang_info["repo_url"] = formatted_repo_url
-
         formatted_notebook_path = str(
             format_github_notebook_url(notebook_path))
 
-        all_notebooks_lang_info[formatted_notebook_path] = lang_info
+        if lang_info is None:
+            # notebooks without language metadata are guessed together once
+            # there are guess_batch_size of them:
+            num_notebooks_to_guess += 1
+        pending_notebooks.append((formatted_notebook_path, formatted_repo_url,
+                                  lang_info, source_code))
+
+        if num_notebooks_to_guess == 0 or num_notebooks_to_guess >= guess_batch_size:
+            yield from guess_pending_notebooks(pending_notebooks)
+            pending_notebooks = []
+            num_notebooks_to_guess = 0
+
         processed_count += 1
-        print(f"{processed_count} processed notebooks of {total_notebooks}")
+        if print_progress:
+            print(f"{processed_count} processed notebooks of {total_notebooks}")
+
+    yield from guess_pending_notebooks(pending_notebooks)
+
+
+def iter_lang_info_in_parallel(path: Path, guess_batch_size: int,
+                               workers: int, shard_size: int):
+
+    total_notebooks = len(path)
+    processed_count = 0
+
+    shards = list(batched(path, shard_size))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # map returns the results of the shards in their order:
+        shards_lang_info = executor.map(
+            generate_lang_info_from_local_nbs, shards,
+            [guess_batch_size] * len(shards), [1] * len(shards),
+            [shard_size] * len(shards), [False] * len(shards))
 
-    return all_notebooks_lang_info
+        for shard, shard_lang_info in zip(shards, shards_lang_info):
+            yield from shard_lang_info.items()
+            processed_count += len(shard)
+            print(f"{processed_count} processed notebooks of {total_notebooks}")
+
+
+def guess_pending_notebooks(pending_notebooks: list):
+    """Guesses the language of the pending notebooks without language info
+    (see iter_lang_info_from_local_nbs), and yields the url and the language
+    info of all of them, in their order"""
+
+    all_guessed_lang_info = iter(guess_language_info(
+        [source_code for _, _, lang_info, source_code in pending_notebooks
+         if lang_info is None]))
+
+    for formatted_notebook_path, formatted_repo_url, lang_info, _ in pending_notebooks:
+        if lang_info is None:
+            lang_info = next(all_guessed_lang_info)
+        lang_info["repo_url"] = formatted_repo_url
+        yield formatted_notebook_path, lang_info
+
+
+def write_lang_info_jsonl(all_lang_info, filepath: Path,
+                          flush_every: int = FLUSH_EVERY):
+    """Writes the language info of the notebooks, given as (notebook url,
+    language info) pairs, in a JSON Lines file, one notebook per line, as
+    they are gathered. The file is flushed every flush_every notebooks, so
+    the notebooks processed so far are kept if the script is interrupted.
+    Returns the number of notebooks written."""
+
+    num_notebooks = 0
+    with open(filepath, 'w', encoding='utf-8') as f:
+        for notebook_url, lang_info in all_lang_info:
+            f.write(json.dumps({"notebook": notebook_url,
+                                "lang_info": lang_info}) + "\n")
+            num_notebooks += 1
+            if num_notebooks % flush_every == 0:
+                f.flush()
+
+    return num_notebooks
 
 
 if __name__ == "__main__":
 
+    parser = argparse.ArgumentParser(
+        description="Gathers the language of the notebooks of the active repositories.")
+    parser.add_argument("--manifest", type=Path, default=None, metavar="PATH",
+                        help="query the notebooks from this manifest instead "
+                        "of walking the repositories.")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of worker processes gathering the "
+                        "language of the notebooks (default: 1). Each worker "
+                        "loads its own guesslang model.")
+    args = parser.parse_args()
+
     # getting path from configs.json:
     complete_directory_path = config.path_active_SE_repos
     full_directory_path = Path(complete_directory_path)
     print("Full Directory Path:", full_directory_path)
 
-    notebook_paths = list(full_directory_path.glob('**/*.ipynb'))
+    notebook_paths = list_files(full_directory_path, args.manifest,
+                                included_suffixes=['.ipynb'])
 
-    lang_info = generate_lang_info_from_local_nbs(notebook_paths)
     folder = Path(Path.cwd(), "research_questions", "src",
                   "language_analysis", "data_only_notebooks")
     result_filepath = folder
     folder.mkdir(exist_ok=True)
 
-    # json with th language info extracted or guessed:
-    with open(Path(result_filepath,
-                   'language_info_SE_purposes_repos.json'), 'w') as f:
-        json.dump(lang_info, f, indent=4)
+    # json lines with th language info extracted or guessed:
+    lang_info = iter_lang_info_from_local_nbs(notebook_paths,
+                                              workers=args.workers)
+    write_lang_info_jsonl(lang_info, Path(
+        result_filepath, 'language_info_SE_purposes_repos.jsonl'))
 
     complete_directory_path = config.path_active_non_SE_repos
     full_directory_path = Path(complete_directory_path)
     print("Full Directory Path:", full_directory_path)
 
-    notebook_paths = list(full_directory_path.glob('**/*.ipynb'))
+    notebook_paths = list_files(full_directory_path, args.manifest,
+                                included_suffixes=['.ipynb'])
 
-    lang_info = generate_lang_info_from_local_nbs(notebook_paths)
-    # json with th language info extracted or guessed:
-    with open(Path(result_filepath,
-                   'language_info_non_SE_purposes_repos.json'), 'w') as f:
-        json.dump(lang_info, f, indent=4)
+    # json lines with th language info extracted or guessed:
+    lang_info = iter_lang_info_from_local_nbs(notebook_paths,
+                                              workers=args.workers)
+    write_lang_info_jsonl(lang_info, Path(
+        result_filepath, 'language_info_non_SE_purposes_repos.jsonl'))
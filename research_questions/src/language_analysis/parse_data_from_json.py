@@ -1,11 +1,29 @@
 """Script that process the results obtained for the language of jupyter 
 notebooks for both SE/Non SE splits. This script also analyze data consistency,
-such as printing the numbers of notebooks in each split"""
+such as printing the numbers of notebooks in each split.
+
+The results are read from the JSON Lines files written by language_only_nbs.py
+(one notebook per line) in chunks, or from the JSON files of its older
+versions when there is no JSON Lines file.
+
+The lists of active repositories of both splits are read once, into an
+index of their urls (see get_split_index), which the notebooks are joined
+with to filter them by split."""
 
 import re
 import pandas as pd
 from pathlib import Path
 import json
+from functools import lru_cache
+
+from research_questions.src.utils.scc import batched
+
+# number of lines of the JSON Lines files converted to a DataFrame at a time:
+CHUNK_SIZE = 10000
+
+# files with the urls of the active repositories of each split:
+SPLIT_FILES = {"SE": "nb_active_SE_purpose_repositories.txt",
+               "non_SE": "nb_active_non_SE_purpose_repositories.txt"}
 
 
 def get_list_active(txt_filepath):
@@ -23,24 +41,61 @@ def get_list_active(txt_filepath):
     return active_list
 
 
-def get_active_repo(dataset_df, column_url_name, repo_type, txt_directory):
+def normalize_urls(urls: pd.Series) -> pd.Series:
+    """Normalizes repository urls, so they match regardless of a trailing
+    slash, surrounding whitespace or their case"""
+
+    return urls.astype(str).str.strip().str.rstrip("/").str.lower()
+
+
+def get_split_index(txt_directory) -> pd.DataFrame:
+    """Index of the active repositories of both splits: a DataFrame with the
+    normalized url (normalized_url column) and the split ("SE" or "non_SE")
+    of each repository. The lists are read only once per directory."""
+
+    return _get_split_index(str(txt_directory))
 
-    if repo_type == 'SE':
-        txt_filepath = Path(
-            txt_directory, "nb_active_SE_purpose_repositories.txt")
 
-        active_list = get_list_active(txt_filepath)
-    else:
-        txt_filepath = Path(
-            txt_directory, "nb_active_non_SE_purpose_repositories.txt")
-        active_list = get_list_active(txt_filepath)
+@lru_cache(maxsize=None)
+def _get_split_index(txt_directory: str) -> pd.DataFrame:
+
+    all_splits = []
+    for split, txt_filename in SPLIT_FILES.items():
+        active_list = [url for url in get_list_active(Path(txt_directory, txt_filename))
+                       if url != ""]
+        all_splits.append(pd.DataFrame({
+            "normalized_url": normalize_urls(pd.Series(active_list, dtype=str)),
+            "split": split}))
+
+    return pd.concat(all_splits, ignore_index=True).drop_duplicates(
+        ignore_index=True)
+
+
+def is_in_index(urls: pd.Series, index_urls: pd.DataFrame):
+    """Whether each url is in index_urls (unique normalized urls, see
+    get_split_index), joining them instead of searching each url"""
+
+    df_urls = pd.DataFrame({"normalized_url": normalize_urls(urls)})
+    df_joined = df_urls.merge(index_urls, on="normalized_url", how="left",
+                              indicator=True)
+
+    return (df_joined["_merge"] == "both").to_numpy()
+
+
+def get_active_repo(dataset_df, column_url_name, repo_type, txt_directory):
+
+    split = 'SE' if repo_type == 'SE' else 'non_SE'
+    split_index = get_split_index(txt_directory)
+    split_urls = split_index.loc[split_index["split"] == split,
+                                 ["normalized_url"]].drop_duplicates()
 
     print(
         f"len of unique repos_url before filtering for {repo_type} repos: {dataset_df[column_url_name].nunique()}")
     print(
         f"len of all repos_url before filtering for {repo_type} repos: {len(dataset_df[column_url_name])}")
 
-    dataset_df = dataset_df.loc[dataset_df[column_url_name].isin(active_list)]
+    dataset_df = dataset_df.loc[is_in_index(dataset_df[column_url_name],
+                                            split_urls)]
 
     print(
         f"len of unique repos_url after filtering for {repo_type} repos: {dataset_df[column_url_name].nunique()}")
@@ -53,15 +108,50 @@ def get_active_repo(dataset_df, column_url_name, repo_type, txt_directory):
     return dataset_df
 
 
-def generate_csv_from_json(json_filepath):
+def generate_csv_from_json(json_filepath, chunk_size=CHUNK_SIZE):
     print("json filepath", json_filepath)
 
+    if Path(json_filepath).suffix == ".jsonl":
+        return generate_csv_from_jsonl(json_filepath, chunk_size)
+
     with open(json_filepath, 'r') as f:
         data = json.load(f)
 
+    return get_lang_info_df(data.items())
+
+
+def generate_csv_from_jsonl(jsonl_filepath, chunk_size=CHUNK_SIZE):
+    """Reads the JSON Lines file written by language_only_nbs.py, converting
+    chunk_size notebooks to a DataFrame at a time. A truncated last line,
+    written when the script was interrupted, is skipped."""
+
+    all_chunks = []
+    with open(jsonl_filepath, 'r', encoding='utf-8') as f:
+        for lines in batched(f, chunk_size):
+            notebooks = []
+            for line in lines:
+                try:
+                    notebook = json.loads(line)
+                except json.JSONDecodeError:
+                    print(f"skipping invalid line of {jsonl_filepath}: {line[:100]}")
+                    continue
+                notebooks.append((notebook["notebook"], notebook["lang_info"]))
+
+            all_chunks.append(get_lang_info_df(notebooks))
+
+    if not all_chunks:
+        return get_lang_info_df([])
+
+    return pd.concat(all_chunks, ignore_index=True)
+
+
+def get_lang_info_df(notebooks):
+    """DataFrame with the language info of the notebooks, given as (notebook
+    url, language info) pairs"""
+
     notebook_in_GitHub, name, version, reason, gitHub_url = [], [], [], [], []
 
-    for key, item in data.items():
+    for key, item in notebooks:
 
         notebook_in_GitHub.append(key)
         try:
@@ -91,6 +181,19 @@ def generate_csv_from_json(json_filepath):
     return df
 
 
+def get_results_filepath(result_filepath, split):
+    """The JSON Lines file with the language info of a split, or the JSON
+    file of the older versions of language_only_nbs.py when there is no JSON
+    Lines file"""
+
+    jsonl_filepath = Path(
+        result_filepath, f'language_info_{split}_purposes_repos.jsonl')
+    if jsonl_filepath.exists():
+        return jsonl_filepath
+
+    return Path(result_filepath, f'language_info_{split}_purposes_repos.json')
+
+
 def get_repos_language_according_to_purpose(json_filepath, dataset_list_dir,
                                             split, result_filepath):
 
@@ -118,26 +221,17 @@ def count_total(df_SE, df_non_SE, dataset_list_dir):
 
     df = pd.concat([df_SE, df_non_SE])
 
-    txt_filepath_SE = Path(
-        dataset_list_dir, "nb_active_SE_purpose_repositories.txt")
-
-    active_list_SE = get_list_active(txt_filepath_SE)
-
-    txt_filepath_non_SE = Path(
-        dataset_list_dir, "nb_active_non_SE_purpose_repositories.txt")
-
-    active_list_non_SE = get_list_active(txt_filepath_non_SE)
-    total = active_list_SE + active_list_non_SE
-    total = [url for url in total if url != ""]
+    total = get_split_index(dataset_list_dir)[["normalized_url"]].drop_duplicates()
 
     print(f"all urls repos (SE + Non SE actives): {len(total)}")
 
-    all_notebooks = df.loc[df['github_url'].isin(total)]
+    in_total = is_in_index(df['github_url'], total)
+    all_notebooks = df.loc[in_total]
     print(
         f" number of SE + Non SE active total notebooks: {len(all_notebooks['notebook_path'])}")
 
     # ensuring all notebooks were 'grouped' in its respective split:
-    not_included = df.loc[~df['github_url'].isin(total)]
+    not_included = df.loc[~in_total]
     print(f"number of not_included urls: {len(not_included)}")
 
 
@@ -157,15 +251,13 @@ if __name__ == '__main__':
 
     # parsing data from the SE split:
 
-    json_filepath = Path(
-        result_filepath, 'language_info_SE_purposes_repos.json')
+    json_filepath = get_results_filepath(result_filepath, "SE")
 
     df_active_SE = get_repos_language_according_to_purpose(
         json_filepath, dataset_lists_path, "SE", result_filepath)
 
     # parsing data from the non SE split:
-    json_filepath = Path(
-        result_filepath, 'language_info_non_SE_purposes_repos.json')
+    json_filepath = get_results_filepath(result_filepath, "non_SE")
 
     df_active_non_SE = get_repos_language_according_to_purpose(
         json_filepath, dataset_lists_path, "non_SE", result_filepath)
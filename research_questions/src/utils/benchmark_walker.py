@@ -0,0 +1,57 @@
+"""Benchmark of the time spent walking the cloned repositories, comparing
+pathlib's rglob (plus an is_file call per path, as the scripts used to do)
+with walk_files.
+
+By default, it walks the directory where the repositories were cloned
+(clone_destination in configs.json). You can run this script with the
+command:
+
+python -m research_questions.src.utils.benchmark_walker
+
+from inside the main directory of this project. Use --path to walk another
+directory. Run it twice to compare both walkers with a warm file system
+cache."""
+
+import argparse
+import time
+from pathlib import Path
+
+from research_questions.configs.configs import Configs
+from .walker import walk_files
+
+
+def walk_with_rglob(path: Path) -> int:
+
+    return sum(1 for filepath in path.rglob("*")
+               if filepath.is_file() and ".git" not in filepath.parts)
+
+
+def walk_with_scandir(path: Path) -> int:
+
+    return sum(1 for _ in walk_files(path))
+
+
+def time_walk(label, function, path):
+
+    start = time.perf_counter()
+    total_files = function(path)
+    elapsed = time.perf_counter() - start
+    print(f"{label}: {total_files} files in {elapsed:.2f} s")
+
+    return elapsed
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--path", type=Path, default=None,
+                        help="directory to walk (default: clone_destination "
+                        "of configs.json)")
+    args = parser.parse_args()
+
+    path = args.path or Path(Configs().clone_destination)
+    print(f"walking {path}")
+
+    rglob_time = time_walk("rglob + is_file", walk_with_rglob, path)
+    scandir_time = time_walk("walk_files (os.scandir)", walk_with_scandir, path)
+    print(f"speedup: {rglob_time / scandir_time:.2f}x")
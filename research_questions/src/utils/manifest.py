@@ -0,0 +1,338 @@
+"""Persistent index (manifest) of the files of the cloned repositories, stored
+in a SQLite database. For every file of an indexed directory, it keeps its
+path relative to the directory, the repository it belongs to (the first
+directory of its path), its size, mtime, suffix and the sha256 of its
+content, so the analysis scripts can query the files of a split or of a
+repository instead of walking the clone directories again.
+
+Refreshing the manifest walks the directories (with walk_files) and only
+hashes the files that are new or whose size or mtime changed since the last
+refresh. Files removed from the directories are removed from the manifest.
+You can build (or refresh) the manifest of all the splits of configs.json
+with the command:
+
+python -m research_questions.src.utils.manifest manifest.sqlite
+
+from inside the main directory of this project, or only of some directories
+with --path. The scripts that accept --manifest fall back to walking the
+directories that are not indexed. An indexed directory whose mtime is newer
+than its last refresh (e.g. a repository was cloned into it) is refreshed
+when queried, and a repository that is newer than the refresh, or that has
+no files in the manifest, is walked instead. The mtime of a directory only
+changes when its own entries change, so refresh the manifest whenever the
+files inside the repositories change."""
+
+import argparse
+import hashlib
+import os
+import sqlite3
+import time
+from collections import Counter, namedtuple
+from pathlib import Path
+from typing import List
+
+from .walker import walk_files
+
+# one connection per process and database, since sqlite connections can not
+# be shared with the forked worker processes:
+_open_manifests = {}
+
+
+class ManifestEntry(namedtuple("ManifestEntry",
+                               ["path", "size", "mtime_ns", "suffix", "sha256"])):
+
+    def is_current(self) -> bool:
+        """Whether the file still has the size and mtime it had when it was
+        indexed, i.e. whether its sha256 can be trusted"""
+
+        if self.sha256 is None:
+            return False
+
+        try:
+            stat_result = os.stat(self.path)
+        except OSError:
+            return False
+
+        return (stat_result.st_size == self.size
+                and stat_result.st_mtime_ns == self.mtime_ns)
+
+
+class Manifest:
+
+    def __init__(self, db_path):
+
+        self.db_path = str(db_path)
+        self.connection = sqlite3.connect(self.db_path, timeout=60)
+        # allows the parallel workers to read while another one writes:
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS roots ("
+            "root TEXT PRIMARY KEY, refreshed REAL NOT NULL)")
+        # position is the order in which walk_files yields the files, so
+        # the queries list them in the same order as walking the directory:
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            "root TEXT NOT NULL, relpath TEXT NOT NULL, "
+            "repository TEXT NOT NULL, size INTEGER NOT NULL, "
+            "mtime_ns INTEGER NOT NULL, suffix TEXT NOT NULL, "
+            "sha256 TEXT NOT NULL, position INTEGER NOT NULL, "
+            "PRIMARY KEY (root, relpath))")
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS files_repository "
+            "ON files (root, repository, position)")
+        self.connection.commit()
+
+    def refresh(self, root) -> Counter:
+        """Indexes the files of root, hashing only the new and modified
+        files. Returns a Counter with the number of new, modified, unchanged
+        and removed files."""
+
+        root = format_root(root)
+        stats = Counter()
+        # the directories modified while walking them are newer than the
+        # refresh, so they are refreshed again when queried:
+        refreshed = time.time()
+        if not os.path.isdir(root):
+            # e.g. an unmounted external drive, which must not be indexed
+            # as an empty directory:
+            print(f"{root} is not a directory and was not indexed")
+            return stats
+
+        indexed_files = {
+            relpath: (size, mtime_ns, sha256)
+            for relpath, size, mtime_ns, sha256 in self.connection.execute(
+                "SELECT relpath, size, mtime_ns, sha256 FROM files "
+                "WHERE root = ?", (root,))}
+
+        rows = []
+        for position, entry in enumerate(walk_files(root)):
+            try:
+                stat_result = entry.stat()
+                relpath = os.path.relpath(entry.path, root)
+                indexed_file = indexed_files.pop(relpath, None)
+
+                if (indexed_file is not None
+                        and indexed_file[:2] == (stat_result.st_size,
+                                                 stat_result.st_mtime_ns)):
+                    sha256 = indexed_file[2]
+                    stats['unchanged'] += 1
+                else:
+                    sha256 = hash_file(entry.path)
+                    stats['new' if indexed_file is None else 'modified'] += 1
+            except OSError as e:
+                print(e)
+                continue
+
+            # files directly inside root do not belong to a repository:
+            parts = relpath.split(os.sep)
+            repository = parts[0] if len(parts) > 1 else ""
+            rows.append((root, relpath, repository, stat_result.st_size,
+                         stat_result.st_mtime_ns,
+                         os.path.splitext(entry.name)[1], sha256, position))
+
+        with self.connection:
+            self.connection.executemany(
+                "DELETE FROM files WHERE root = ? AND relpath = ?",
+                [(root, relpath) for relpath in indexed_files])
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO files (root, relpath, repository, "
+                "size, mtime_ns, suffix, sha256, position) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self.connection.execute(
+                "INSERT OR REPLACE INTO roots (root, refreshed) VALUES (?, ?)",
+                (root, refreshed))
+        stats['removed'] = len(indexed_files)
+
+        return stats
+
+    def entries(self, directory, included_suffixes=None, excluded_suffixes=(),
+                pruned_directories=('.git',), max_file_size=None) -> List[ManifestEntry]:
+        """Returns the ManifestEntry of each file inside directory, in the
+        order walk_files yields them, selected with the same arguments as
+        walk_files (and max_file_size, in bytes). directory must be an
+        indexed directory or one of its repositories. Returns None when it
+        is not indexed, or when it is a repository that changed since the
+        last refresh, so it must be walked. An indexed directory that
+        changed since the last refresh is refreshed first. Files removed
+        since the last refresh are skipped, and files modified since then
+        are returned with their current size and mtime, without sha256."""
+
+        query = self.locate(directory)
+        if query is None:
+            return None
+        root, repository = query
+
+        if self.is_outdated(root, repository):
+            if repository is not None:
+                # refreshing the whole root for a repository would be too
+                # slow, and the parallel workers would all refresh it:
+                print(f"{format_root(directory)} changed since the manifest "
+                      "was refreshed and is walked instead")
+                return None
+            print(f"{root} changed since the manifest was refreshed, "
+                  "refreshing it")
+            self.refresh(root)
+
+        sql = ("SELECT relpath, size, mtime_ns, suffix, sha256 FROM files "
+               "WHERE root = ?")
+        parameters = [root]
+        if repository is not None:
+            sql += " AND repository = ?"
+            parameters.append(repository)
+        if included_suffixes is not None:
+            sql += f" AND suffix IN ({', '.join('?' * len(included_suffixes))})"
+            parameters += list(included_suffixes)
+        sql += " ORDER BY position"
+
+        entries = []
+        for relpath, size, mtime_ns, suffix, sha256 in self.connection.execute(
+                sql, parameters):
+            if suffix.lower() in excluded_suffixes:
+                continue
+            # .git is never indexed, but other directories can be pruned:
+            if any(part in pruned_directories
+                   for part in relpath.split(os.sep)):
+                continue
+
+            # the files inside the subdirectories of a repository can change
+            # without changing the mtime of the repository:
+            entry = ManifestEntry(Path(root, relpath), size, mtime_ns, suffix,
+                                  sha256)
+            try:
+                stat_result = os.stat(entry.path)
+            except OSError:
+                continue
+            if (stat_result.st_size, stat_result.st_mtime_ns) != (size, mtime_ns):
+                entry = ManifestEntry(entry.path, stat_result.st_size,
+                                      stat_result.st_mtime_ns, suffix, None)
+
+            if max_file_size is not None and entry.size > max_file_size:
+                continue
+            entries.append(entry)
+
+        return entries
+
+    def locate(self, directory):
+        """Returns the indexed root of directory and the name of its
+        repository (None when directory is the root itself), or None when
+        directory is not indexed"""
+
+        directory = format_root(directory)
+        if self.is_indexed(directory):
+            return directory, None
+
+        parent, repository = os.path.split(directory)
+        if self.is_indexed(parent):
+            return parent, repository
+
+        return None
+
+    def is_outdated(self, root, repository=None) -> bool:
+        """Whether root (or its repository) was modified after the last
+        refresh of root, or the repository has no files in the manifest"""
+
+        directory = root if repository is None else os.path.join(root, repository)
+        try:
+            mtime = os.stat(directory).st_mtime
+        except OSError:
+            # e.g. an unmounted drive, whose files are kept:
+            return False
+
+        refreshed = self.connection.execute(
+            "SELECT refreshed FROM roots WHERE root = ?", (root,)).fetchone()[0]
+        if mtime > refreshed:
+            return True
+
+        if repository is None:
+            return False
+
+        return self.connection.execute(
+            "SELECT 1 FROM files WHERE root = ? AND repository = ? LIMIT 1",
+            (root, repository)).fetchone() is None
+
+    def is_indexed(self, root) -> bool:
+
+        return self.connection.execute(
+            "SELECT 1 FROM roots WHERE root = ?", (root,)).fetchone() is not None
+
+    def __len__(self):
+        return self.connection.execute(
+            "SELECT COUNT(*) FROM files").fetchone()[0]
+
+
+def open_manifest(db_path):
+    """Returns the Manifest of db_path opened by the current process"""
+
+    if db_path is None:
+        return None
+
+    key = (os.getpid(), str(db_path))
+    if key not in _open_manifests:
+        _open_manifests[key] = Manifest(db_path)
+
+    return _open_manifests[key]
+
+
+def list_files(directory, manifest_path=None, included_suffixes=None,
+               excluded_suffixes=(), pruned_directories=('.git',)) -> List[Path]:
+    """Returns the paths of the files inside directory, selected as in
+    walk_files. They are queried from the manifest when directory is
+    indexed in it, otherwise directory is walked."""
+
+    manifest = open_manifest(manifest_path)
+    if manifest is not None:
+        entries = manifest.entries(directory, included_suffixes,
+                                   excluded_suffixes, pruned_directories)
+        if entries is not None:
+            return [entry.path for entry in entries]
+
+    return [Path(entry.path) for entry in walk_files(
+        directory, included_suffixes, excluded_suffixes, pruned_directories)]
+
+
+def format_root(directory) -> str:
+    """Absolute path of a directory, as it is saved in the manifest"""
+
+    return os.path.abspath(directory)
+
+
+def hash_file(filepath) -> str:
+    """sha256 of the content of a file"""
+
+    file_hash = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            file_hash.update(chunk)
+
+    return file_hash.hexdigest()
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(
+        description="Builds or refreshes the manifest of the cloned repositories.")
+    parser.add_argument("db_path", type=Path, help="path of the manifest database")
+    parser.add_argument("--path", type=Path, nargs="*", default=None,
+                        help="directories to index (default: the directories "
+                        "of all the splits in configs.json)")
+    args = parser.parse_args()
+
+    if args.path:
+        directories = args.path
+    else:
+        from research_questions.configs.configs import Configs
+        config = Configs()
+        directories = [config.path_active_SE_py_repos,
+                       config.path_active_non_SE_py_repos,
+                       config.path_active_non_SE_repos,
+                       config.path_active_SE_repos,
+                       config.kaggle_dataset]
+
+    manifest = Manifest(args.db_path)
+    for directory in directories:
+        start = time.perf_counter()
+        stats = manifest.refresh(directory)
+        print(f"{directory}: {stats['new']} new, {stats['modified']} modified, "
+              f"{stats['unchanged']} unchanged and {stats['removed']} removed "
+              f"files in {time.perf_counter() - start:.2f} s")
+    print(f"{len(manifest)} files in {args.db_path}")
@@ -0,0 +1,229 @@
+"""Lightweight reader of notebooks, decoding the JSON of the .ipynb file
+directly instead of reading it with nbformat, which validates the notebook
+and builds NotebookNode objects for every cell and output. Only the metadata
+and the type and source of the cells are kept, discarding the outputs (e.g.
+megabytes of embedded images) right after decoding.
+
+The notebooks returned keep the layout of their nbformat version ("cells",
+or "worksheets" in nbformat 3, and "source", or "input" in the code cells of
+nbformat 3), so they can be used as the notebooks read by nbformat with
+NO_CONVERT. When the orjson library is installed, it is used to decode the
+JSON, which is faster than the json module.
+
+Notebooks with hundreds of MB of outputs (e.g. base64 images) would still be
+fully decoded in memory. With the ijson library installed, notebooks bigger
+than STREAMING_MIN_SIZE are parsed incrementally instead (read_notebook_stream):
+the file is streamed through as parsing events, and the outputs of the cells
+are discarded as they are read, without building them, so the memory needed
+per notebook is proportional to its source code rather than its outputs.
+Both libraries are in requirements.txt. Without ijson, a warning is printed
+(once per process) the first time a notebook that would be streamed is
+fully decoded instead."""
+
+import json
+import os
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# the only keys of the cells that are kept:
+CELL_KEYS = ("cell_type", "source", "input")
+
+# notebooks of this size (in bytes) or bigger are streamed, when ijson is
+# installed:
+STREAMING_MIN_SIZE = 10 * 1024 * 1024
+
+# prefixes (in ijson's notation) of the cells of nbformat 4 and nbformat 3
+# notebooks, whose outputs are discarded when streaming:
+CELL_PREFIXES = ("cells.item", "worksheets.item.cells.item")
+
+# bytes read at a time when streaming. Big buffers are much faster with the
+# long strings of the outputs than the default of ijson (64 KB):
+STREAMING_BUFFER_SIZE = 1024 * 1024
+
+# whether the warning about a big notebook read without ijson was printed:
+_warned_without_streaming = False
+
+
+def loads(data: bytes):
+    """Decodes JSON with orjson, when installed, or with the json module"""
+
+    if orjson is not None:
+        return orjson.loads(data)
+
+    return json.loads(data)
+
+
+def read_notebook_json(filepath, streaming=None) -> dict:
+    """Reads a notebook without its outputs. Raises an exception (e.g.
+    ValueError or KeyError) when the file is not a valid notebook JSON.
+    streaming: whether to stream through the notebook with ijson (see
+    read_notebook_stream). With None, only the notebooks bigger than
+    STREAMING_MIN_SIZE are streamed, when ijson is installed."""
+
+    if streaming is None:
+        streaming = is_big_notebook(filepath)
+
+    if streaming:
+        notebook = read_notebook_stream(filepath)
+    else:
+        with open(filepath, "rb") as f:
+            notebook = loads(f.read())
+
+    return strip_notebook(notebook)
+
+
+def read_notebook_stream(filepath) -> dict:
+    """Reads a notebook incrementally with ijson, replacing the outputs of
+    each cell with an empty list without building them. The rest of the
+    notebook is kept as it is in the file. Requires the ijson library."""
+
+    if ijson is None:
+        raise ImportError("streaming notebooks requires the ijson library")
+
+    builder = ijson.ObjectBuilder()
+    # depth of the containers inside the outputs being discarded:
+    skipped_depth = 0
+    skipping_value = False
+
+    with open(filepath, "rb") as f:
+        # use_float decodes the numbers as json does, instead of Decimal:
+        for prefix, event, value in ijson.parse(
+                f, use_float=True, buf_size=STREAMING_BUFFER_SIZE):
+
+            if skipping_value:
+                skipping_value = False
+                if event in ("start_map", "start_array"):
+                    skipped_depth = 1
+                continue
+
+            if skipped_depth:
+                if event in ("start_map", "start_array"):
+                    skipped_depth += 1
+                elif event in ("end_map", "end_array"):
+                    skipped_depth -= 1
+                continue
+
+            builder.event(event, value)
+
+            if (event == "map_key" and value == "outputs"
+                    and prefix in CELL_PREFIXES):
+                # the outputs are replaced by an empty list, so the cell
+                # keeps the keys nbformat expects:
+                builder.event("start_array", None)
+                builder.event("end_array", None)
+                skipping_value = True
+
+    return builder.value
+
+
+def read_notebook_metadata(filepath, streaming=None):
+    """Reads only the top-level metadata of a notebook. Returns None when the
+    notebook has no metadata, and raises an exception (e.g. ValueError) when
+    the file is not valid JSON.
+    streaming: whether to stream through the notebook with ijson, building
+    only the metadata and stopping as soon as it is read (it usually comes
+    after the cells). With None, only the notebooks bigger than
+    STREAMING_MIN_SIZE are streamed, since decoding small notebooks at once
+    is faster."""
+
+    if streaming is None:
+        streaming = is_big_notebook(filepath)
+
+    if streaming:
+        if ijson is None:
+            raise ImportError("streaming notebooks requires the ijson library")
+
+        with open(filepath, "rb") as f:
+            for metadata in ijson.items(f, "metadata", use_float=True,
+                                        buf_size=STREAMING_BUFFER_SIZE):
+                return metadata
+        return None
+
+    with open(filepath, "rb") as f:
+        notebook = loads(f.read())
+
+    if not isinstance(notebook, dict):
+        raise ValueError("the notebook is not a JSON object")
+
+    return notebook.get("metadata")
+
+
+def is_big_notebook(filepath) -> bool:
+    """Whether a notebook is streamed when read with streaming=None"""
+
+    global _warned_without_streaming
+
+    if os.path.getsize(filepath) < STREAMING_MIN_SIZE:
+        return False
+
+    if ijson is None:
+        if not _warned_without_streaming:
+            print(f"warning: {filepath} is bigger than {STREAMING_MIN_SIZE} "
+                  "bytes, but the ijson library is not installed, so it is "
+                  "fully loaded in memory instead of streamed (see "
+                  "requirements.txt)")
+            _warned_without_streaming = True
+        return False
+
+    return True
+
+
+def read_notebook_node(filepath, streaming=None):
+    """Reads a notebook as nbformat.read with NO_CONVERT does, returning a
+    NotebookNode. When streaming (by default, only for the notebooks bigger
+    than STREAMING_MIN_SIZE, see read_notebook_stream), the outputs of the
+    cells are empty, and the notebook is not validated."""
+
+    import nbformat
+    from nbformat.reader import get_version
+
+    if streaming is None:
+        streaming = is_big_notebook(filepath)
+
+    if not streaming:
+        return nbformat.read(filepath, as_version=nbformat.NO_CONVERT)
+
+    notebook = read_notebook_stream(filepath)
+    major, minor = get_version(notebook)
+
+    return nbformat.versions[major].to_notebook_json(notebook, minor=minor)
+
+
+def strip_notebook(notebook: dict) -> dict:
+    """Copy of a decoded notebook with only its metadata and the type and
+    source of its cells"""
+
+    stripped_notebook = {
+        "nbformat": notebook["nbformat"],
+        "nbformat_minor": notebook.get("nbformat_minor", 0),
+        "metadata": notebook.get("metadata", {}),
+    }
+
+    # notebooks in the nbformat 3 keep their cells inside worksheets:
+    if "worksheets" in notebook:
+        stripped_notebook["worksheets"] = [
+            {"cells": [strip_cell(cell) for cell in worksheet["cells"]]}
+            for worksheet in notebook["worksheets"]]
+    else:
+        stripped_notebook["cells"] = [strip_cell(cell)
+                                      for cell in notebook["cells"]]
+
+    return stripped_notebook
+
+
+def strip_cell(cell: dict) -> dict:
+
+    stripped_cell = {key: cell[key] for key in CELL_KEYS if key in cell}
+    # a cell without type is not valid, and is left to nbformat:
+    if not isinstance(stripped_cell["cell_type"], str):
+        raise ValueError(f"invalid cell type: {stripped_cell['cell_type']}")
+
+    return stripped_cell
@@ -0,0 +1,65 @@
+"""Runs the scc library (https://github.com/boyter/scc) over many files with a
+single invocation. Starting one scc process per file makes the process
+startup dominate the running time of the loc scripts, so the files are
+grouped in batches and scc reports the results of each file of a batch with
+its per file output mode (--by-file)."""
+
+import json
+import subprocess
+from itertools import islice
+from typing import Iterable, List
+
+
+def batched(iterable: Iterable, batch_size: int):
+    """Splits an iterable in lists with at most batch_size elements"""
+
+    iterator = iter(iterable)
+    batch = list(islice(iterator, batch_size))
+    while batch:
+        yield batch
+        batch = list(islice(iterator, batch_size))
+
+
+def run_scc_batch(paths: List[str], timeout: int = None) -> dict:
+    """Runs scc once for a batch of files.
+    Args:
+        paths: the files to run loc on
+        timeout: seconds to wait for scc to finish the whole batch
+    Returns:
+        batch_results: a dict mapping each path passed as parameter to the
+        per file results of scc (Language, Code, Comment, Blank, Lines, Bytes,
+        Complexity, ...). Files scc could not read, or whose language scc
+        does not know, are missing from the dict."""
+
+    paths = [str(path) for path in paths]
+    byte_output = subprocess.check_output(
+        ['scc', '--by-file', '--format', 'json'] + paths, timeout=timeout)
+
+    batch_results = {}
+    # scc groups the results by language, and each language lists the
+    # results of its files:
+    for language_summary in json.loads(byte_output.decode('UTF-8')) or []:
+        for file_result in language_summary.get('Files') or []:
+            batch_results[file_result['Location']] = file_result
+
+    return batch_results
+
+
+def to_language_summary(file_result: dict) -> dict:
+    """Formats the per file results of scc like the language summary scc
+    returns when it runs on a single file, so the results of a batch can be
+    saved in the same csv columns."""
+
+    return {
+        'Name': file_result['Language'],
+        'Bytes': file_result['Bytes'],
+        'CodeBytes': file_result.get('CodeBytes', 0),
+        'Lines': file_result['Lines'],
+        'Code': file_result['Code'],
+        'Comment': file_result['Comment'],
+        'Blank': file_result['Blank'],
+        'Complexity': file_result['Complexity'],
+        'Count': 1,
+        'WeightedComplexity': file_result['WeightedComplexity'],
+        'Files': []
+    }
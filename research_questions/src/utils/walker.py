@@ -0,0 +1,60 @@
+"""Fast walker of the files of the cloned repositories, shared by the scripts
+that need to find files in them. It walks the directories iteratively with
+os.scandir, which already returns whether each entry is a file or a
+directory (so no extra stat call is needed per file, as with pathlib's rglob
+plus is_file), and does not descend into pruned directories such as .git.
+
+The files are yielded in the same order as pathlib's rglob: the files of a
+directory, then the files of each of its subdirectories, recursively."""
+
+import os
+from typing import Iterator
+
+
+def walk_files(root, included_suffixes=None, excluded_suffixes=(),
+               pruned_directories=('.git',)) -> Iterator[os.DirEntry]:
+    """Yields the os.DirEntry of each file inside root.
+    Args:
+        root: the directory to walk
+        included_suffixes: only files with these suffixes are yielded. With
+        None, all the files not excluded are yielded.
+        excluded_suffixes: files with these suffixes (compared in lowercase)
+        are not yielded.
+        pruned_directories: names of the directories that are not walked
+        (files with these names are not yielded either).
+    """
+
+    directories = [os.fspath(root)]
+
+    while directories:
+        directory = directories.pop()
+        subdirectories = []
+
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        # links to directories are not followed, to avoid
+                        # walking the same files twice (or forever):
+                        if entry.is_dir(follow_symlinks=False):
+                            if entry.name not in pruned_directories:
+                                subdirectories.append(entry.path)
+
+                        elif entry.is_file():
+                            # e.g. the .git file of git submodules:
+                            if entry.name in pruned_directories:
+                                continue
+                            suffix = os.path.splitext(entry.name)[1]
+                            if suffix.lower() in excluded_suffixes:
+                                continue
+                            if (included_suffixes is None
+                                    or suffix in included_suffixes):
+                                yield entry
+                    except OSError as e:
+                        print(e)
+        except OSError as e:
+            print(e)
+            continue
+
+        # the first subdirectory is walked first:
+        directories.extend(reversed(subdirectories))
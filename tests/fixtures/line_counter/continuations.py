@@ -0,0 +1,12 @@
+total = 1 + \
+    2 + \
+    3
+values = [
+    1,
+    # a comment inside brackets
+
+    2,
+]
+if total and \
+        values:
+    print(total)
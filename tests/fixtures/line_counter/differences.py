@@ -0,0 +1,7 @@
+def function():
+    r"""Raw docstring with a \d regex."""
+    message = (
+        """text of a
+        message"""
+        + "!")
+    return message
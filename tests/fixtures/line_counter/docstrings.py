@@ -0,0 +1,21 @@
+"""Module docstring
+
+with a blank line inside."""
+
+import os
+
+
+def function(a):
+    """One line docstring."""
+    # a comment
+    return a  # trailing comment
+
+
+class Class:
+    '''
+    Multi-line docstring with single quotes.
+    '''
+
+    def method(self):
+        """Docstring followed by code."""
+        return os.getcwd()
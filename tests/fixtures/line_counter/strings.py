@@ -0,0 +1,10 @@
+text = """first line
+
+# not a comment
+last line"""
+url = "http://example.com/#anchor"
+query = ('''
+SELECT *
+''')
+
+print(text, url, query)
@@ -0,0 +1,49 @@
+"""Tests of resuming the analysis of the Kaggle split from its checkpoint
+(see get_complexity_metrics_kaggle in research_questions/src/complexity/main.py)."""
+
+from research_questions.src.complexity import main
+
+
+def write_files(directory, num_files=5):
+
+    directory.mkdir()
+    for position in range(num_files):
+        (directory / f"file_{position}.py").write_text(
+            f"def function_{position}(a):\n    return a or {position}\n")
+
+
+def run_kaggle(tmp_path, checkpoint_path, resume=False):
+
+    return list(main.get_complexity_metrics_kaggle(
+        tmp_path / "kaggle", tmp_path / "staging", "Kaggle",
+        python_loc='tokenize', chunk_size=2, checkpoint_path=checkpoint_path,
+        resume=resume))
+
+
+def test_resume_skips_saved_chunks(tmp_path, monkeypatch):
+
+    write_files(tmp_path / "kaggle")
+    checkpoint_path = tmp_path / "Kaggle.jsonl"
+    all_results = run_kaggle(tmp_path, checkpoint_path)
+    assert len(all_results) == 5
+
+    # keeping only the first chunk, as if the run was interrupted:
+    first_line = checkpoint_path.read_text().splitlines(True)[0]
+    checkpoint_path.write_text(first_line)
+
+    analyzed_chunks = []
+    analyze_chunk = main.analyze_chunk
+
+    def counting_analyze_chunk(chunk, *args, **kwargs):
+        analyzed_chunks.append(chunk)
+        return analyze_chunk(chunk, *args, **kwargs)
+
+    monkeypatch.setattr(main, "analyze_chunk", counting_analyze_chunk)
+
+    assert run_kaggle(tmp_path, checkpoint_path, resume=True) == all_results
+    assert len(analyzed_chunks) == 2
+
+    # without resume, the checkpoint is started again:
+    analyzed_chunks.clear()
+    assert run_kaggle(tmp_path, checkpoint_path) == all_results
+    assert len(analyzed_chunks) == 3
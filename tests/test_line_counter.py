@@ -0,0 +1,43 @@
+"""Tests of the tokenize line counter (see
+research_questions/src/complexity/line_counter.py) against the counts of scc
+for the files of tests/fixtures/line_counter. The expected counts of each
+fixture are in expected.json: "scc" are the counts of scc (code, comment and
+blank lines), and "tokenize" the counts of the line counter, only for the
+fixtures in which they deliberately differ from scc."""
+
+import json
+from pathlib import Path
+
+import pytest
+
+from research_questions.src.complexity.line_counter import count_python_lines
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures" / "line_counter"
+
+with open(FIXTURES_DIR / "expected.json") as f:
+    EXPECTED_COUNTS = json.load(f)
+
+
+@pytest.mark.parametrize("filename", sorted(EXPECTED_COUNTS))
+def test_counts_match_scc(filename):
+
+    source_code = (FIXTURES_DIR / filename).read_text(encoding="utf-8")
+    counts = count_python_lines(source_code)
+    # scc counts the docstrings as comments:
+    obtained = {"code": counts["code"],
+                "comment": counts["comment"] + counts["docstring"],
+                "blank": counts["blank"]}
+
+    expected = EXPECTED_COUNTS[filename]
+    assert obtained == expected.get("tokenize", expected["scc"])
+    # every line is counted once:
+    assert sum(obtained.values()) == len(source_code.splitlines())
+
+
+def test_docstrings_are_counted_apart():
+
+    counts = count_python_lines(
+        (FIXTURES_DIR / "docstrings.py").read_text(encoding="utf-8"))
+
+    assert counts["docstring"] == 8
+    assert counts["comment"] == 1
@@ -0,0 +1,99 @@
+"""Tests of the manifest of the cloned repositories (see
+research_questions/src/utils/manifest.py)."""
+
+from research_questions.src.complexity.main import (AnalysisOptions,
+                                                    analyze_file,
+                                                    get_complexity_metrics)
+from research_questions.src.utils.manifest import Manifest, list_files
+
+
+def create_repository(root, name):
+
+    repository = root / name
+    (repository / "src").mkdir(parents=True)
+    (repository / "src" / "main.py").write_text("print('main')\n")
+    (repository / "notebook.ipynb").write_text("{}")
+
+    return repository
+
+
+def backdate_refresh(manifest, root, seconds=10):
+    """Moves the last refresh of root to the past, since the mtime of the
+    directories has a coarse resolution in some file systems"""
+
+    with manifest.connection:
+        manifest.connection.execute(
+            "UPDATE roots SET refreshed = refreshed - ? WHERE root = ?",
+            (seconds, str(root)))
+
+
+def test_new_repository_is_listed(tmp_path):
+
+    root = tmp_path / "repositories"
+    create_repository(root, "owner_____first")
+    manifest_path = tmp_path / "manifest.sqlite"
+    manifest = Manifest(manifest_path)
+    manifest.refresh(root)
+    backdate_refresh(manifest, root)
+
+    repository = create_repository(root, "owner_____second")
+
+    # the repository is walked, since it is not in the manifest:
+    assert manifest.entries(repository) is None
+    assert sorted(list_files(repository, manifest_path)) == sorted(
+        [repository / "src" / "main.py", repository / "notebook.ipynb"])
+
+    # the root is refreshed before listing its files:
+    assert len(list_files(root, manifest_path)) == 4
+    assert len(manifest.entries(repository)) == 2
+
+
+def test_unchanged_repository_is_queried(tmp_path):
+
+    root = tmp_path / "repositories"
+    repository = create_repository(root, "owner_____first")
+    manifest_path = tmp_path / "manifest.sqlite"
+    manifest = Manifest(manifest_path)
+    manifest.refresh(root)
+
+    entries = manifest.entries(repository, included_suffixes=[".py"])
+    assert [entry.path for entry in entries] == [repository / "src" / "main.py"]
+
+
+def test_removed_nested_file_is_skipped(tmp_path):
+
+    root = tmp_path / "repositories"
+    repository = create_repository(root, "owner_____first")
+    (repository / "src" / "other.py").write_text("print('other')\n")
+    manifest_path = tmp_path / "manifest.sqlite"
+    manifest = Manifest(manifest_path)
+    manifest.refresh(root)
+
+    # neither the repository nor the root change their mtime:
+    (repository / "src" / "other.py").unlink()
+    (repository / "src" / "main.py").write_text("print('modified main')\n")
+
+    entries = {entry.path: entry for entry in manifest.entries(repository)}
+    assert sorted(entries) == sorted(
+        [repository / "src" / "main.py", repository / "notebook.ipynb"])
+    assert not entries[repository / "src" / "main.py"].is_current()
+    assert entries[repository / "notebook.ipynb"].is_current()
+
+    all_results = list(get_complexity_metrics(
+        root, tmp_path / "staging", "split", python_loc='tokenize',
+        manifest_path=manifest_path))
+    assert sorted(results["filepath"] for results in all_results) == [
+        "/owner/first/notebook.ipynb", "/owner/first/src/main.py"]
+
+
+def test_file_removed_after_listing_is_recorded(tmp_path):
+
+    source_dir = tmp_path / "repositories"
+    repository = create_repository(source_dir, "owner_____first")
+    removed_file = repository / "src" / "main.py"
+    removed_file.unlink()
+
+    file_results, _ = analyze_file(removed_file, source_dir, tmp_path,
+                                   AnalysisOptions(python_loc='tokenize'))
+    assert file_results["filepath"] == "/owner/first/src/main.py"
+    assert "No such file" in file_results["errors"]
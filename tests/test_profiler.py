@@ -0,0 +1,59 @@
+"""Tests of the profile of the stages of the complexity analysis (see
+research_questions/src/complexity/profiler.py)."""
+
+import json
+
+from research_questions.src.complexity.guarded_analysis import get_guarded_analyzer
+from research_questions.src.complexity.main import AnalysisOptions, analyze_files
+from research_questions.src.complexity.profiler import CALLS_PREFIX
+
+
+def write_files(directory):
+
+    files = []
+    for position in range(4):
+        filepath = directory / f"file_{position}.py"
+        filepath.write_text(f"def function_{position}(a):\n"
+                            f"    # a comment\n"
+                            f"    return a if a else {position}\n")
+        files.append(filepath)
+
+    notebook = {"cells": [{"cell_type": "code", "execution_count": None,
+                           "metadata": {}, "outputs": [],
+                           "source": "import os\nprint(os.getcwd())\n"}],
+                "metadata": {}, "nbformat": 4, "nbformat_minor": 4}
+    filepath = directory / "notebook.ipynb"
+    filepath.write_text(json.dumps(notebook))
+    files.append(filepath)
+
+    return files
+
+
+def get_calls(stats):
+
+    return {key: value for key, value in stats.items()
+            if key.startswith(CALLS_PREFIX)}
+
+
+def test_guarded_profile_counts_each_stage_once(tmp_path):
+
+    source_dir = tmp_path / "source"
+    source_dir.mkdir()
+    files = write_files(source_dir)
+    destination_path = tmp_path / "destination"
+    destination_path.mkdir()
+
+    _, stats = analyze_files(files, source_dir, destination_path,
+                             AnalysisOptions(python_loc='tokenize',
+                                             profile=True))
+
+    guarded_options = AnalysisOptions(python_loc='tokenize', profile=True,
+                                      file_timeout=60)
+    try:
+        _, guarded_stats = analyze_files(files, source_dir, destination_path,
+                                         guarded_options)
+    finally:
+        get_guarded_analyzer(60, None).stop()
+
+    assert get_calls(stats)[CALLS_PREFIX + "copy"] == len(files)
+    assert get_calls(guarded_stats) == get_calls(stats)